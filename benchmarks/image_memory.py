@@ -0,0 +1,74 @@
+"""
+Peak memory benchmark for embedding large images.
+
+Renders a one-image email for a range of image sizes, once with whole-file encoding and once
+with chunked streaming, each in a fresh interpreter so the reported peak RSS belongs to that
+render alone. With streaming enabled the peak should stay flat as the image grows.
+
+Usage:
+    python benchmarks/image_memory.py --sizes 1 8 32 64 [--json results.json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, resource
+sys.path.insert(0, {root!r})
+from emailer.generator import EmailHTMLGenerator
+generator = EmailHTMLGenerator({config!r}, {output!r}, stream_images_over={threshold!r})
+generator.logger.disabled = True
+generator.generate_html()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(peak if sys.platform == "darwin" else peak * 1024)
+"""
+
+
+def measure(config: str, output: str, threshold) -> int:
+    """Renders the config in a fresh interpreter and returns its peak RSS in bytes."""
+    code = CHILD.format(root=ROOT, config=config, output=output, threshold=threshold)
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure peak RSS while embedding images of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32, 64], help="Image sizes in MiB")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mib in args.sizes:
+            image = os.path.join(tmp, f"hero_{size_mib}.jpg")
+            # Written in 1 MiB pieces so the parent's own peak RSS stays small; forked children inherit it
+            with open(image, "wb") as f:
+                for _ in range(size_mib):
+                    f.write(os.urandom(1024 * 1024))
+            config = os.path.join(tmp, f"email_{size_mib}.yaml")
+            with open(config, "w", encoding="utf-8") as f:
+                f.write(f'title: "Memory benchmark"\nsections:\n  - type: "image"\n    src: "{image}"\n    alt: "hero"\n')
+            output = os.path.join(tmp, "out.html")
+
+            row = {"size_mib": size_mib}
+            for mode, threshold in (("whole", None), ("streamed", 0)):
+                row[f"{mode}_peak_rss_mib"] = round(measure(config, output, threshold) / (1024 * 1024), 1)
+            results.append(row)
+            os.remove(image)
+
+    print(f"{'image MiB':>10} {'whole RSS MiB':>14} {'streamed RSS MiB':>17}")
+    for row in results:
+        print(f"{row['size_mib']:>10} {row['whole_peak_rss_mib']:>14} {row['streamed_peak_rss_mib']:>17}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
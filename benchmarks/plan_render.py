@@ -0,0 +1,96 @@
+"""
+Benchmark comparing compiled render plans against generate_html-style rendering.
+
+Loads a config once, then renders it repeatedly into an in-memory buffer, once through the
+generator (which walks the sections on every render) and once through a compiled RenderPlan.
+
+Usage:
+    python benchmarks/plan_render.py [--config samples/functionality.yaml] [--sections 200] [--repeat 200]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yaml  # noqa: E402
+from emailer.generator import EmailHTMLGenerator  # noqa: E402
+
+ICON = os.path.join(ROOT, "samples", "assets", "work-icon.jpg")
+
+
+def synthetic_config(sections: int) -> dict:
+    """Builds a config that cycles through every section type."""
+    styles = {"background-color": "#ffffff", "color": "#333333", "padding": "20px", "font-size": "16px"}
+    templates = [
+        {"type": "header", "content": "Header", "styles": styles},
+        {"type": "paragraph", "content": "Line one\nLine two with <b>markup</b>", "styles": styles},
+        {"type": "list", "items": [f"Item {i}" for i in range(5)], "styles": styles},
+        {"type": "image", "src": ICON, "alt": "icon", "width": "80px", "styles": styles},
+        {"type": "block", "styles": styles, "rows": [{"columns": [
+            {"type": "icon", "src": ICON, "alt": "icon", "width": "40px", "styles": {"padding": "10px"}},
+            {"type": "text", "content": "Column text", "styles": {"font-size": "14px"}},
+            {"type": "link", "content": "Open", "href": "https://example.com", "styles": {"border-radius": "5px"}},
+        ]}] * 3},
+    ]
+    return {"title": "Plan benchmark", "sections": [templates[i % len(templates)] for i in range(sections)]}
+
+
+def time_renders(render, repeat: int) -> float:
+    """Returns the mean seconds per call of render(buffer)."""
+    render(io.StringIO())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render(io.StringIO())
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare RenderPlan rendering with generator rendering.")
+    parser.add_argument("--config", type=str, default=None, help="Config file to render (default: synthetic)")
+    parser.add_argument("--sections", type=int, default=200, help="Sections in the synthetic config")
+    parser.add_argument("--repeat", type=int, default=200, help="Renders per measurement")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = args.config
+        if config_file is None:
+            config_file = os.path.join(tmp, "synthetic.yaml")
+            with open(config_file, "w", encoding="utf-8") as f:
+                yaml.dump(synthetic_config(args.sections), f)
+
+        generator = EmailHTMLGenerator(config_file, os.path.join(tmp, "out.html"))
+        generator.logger.disabled = True
+
+        start = time.perf_counter()
+        plan = generator.compile()
+        compile_time = time.perf_counter() - start
+
+        generator_time = time_renders(generator.render_to, args.repeat)
+        plan_time = time_renders(plan.render_to, args.repeat)
+
+    result = {
+        "config": args.config or f"synthetic:{args.sections}",
+        "compile_ms": round(compile_time * 1000, 3),
+        "generator_render_ms": round(generator_time * 1000, 3),
+        "plan_render_ms": round(plan_time * 1000, 3),
+        "speedup": round(generator_time / plan_time, 1) if plan_time else None,
+        "plan_fragments": len(plan.fragments),
+        "plan_static_chars": plan.static_size,
+    }
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Startup benchmark for library use: import, construct and render a small email in a fresh interpreter.
+
+Each run starts a new Python process so module imports are measured cold, as in a short-lived
+worker or the first request of a service. The child reports the time spent importing
+emailer.generator, constructing an EmailHTMLGenerator for a small config, rendering it into an
+in-memory buffer, and constructing and rendering a second one, as each later request of a service
+would. The parent records the wall time of the whole process and fails if any file was created.
+
+Usage:
+    python benchmarks/startup.py [--runs 20] [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+start = time.perf_counter()
+import sys
+sys.path.insert(0, {root!r})
+import io
+from emailer.generator import EmailHTMLGenerator
+imported = time.perf_counter()
+generator = EmailHTMLGenerator({config!r}, {output!r})
+constructed = time.perf_counter()
+generator.render_to(io.StringIO())
+rendered = time.perf_counter()
+# A second email in the same process is what each request of a long-running service pays
+EmailHTMLGenerator({config!r}, {output!r}).render_to(io.StringIO())
+warm = time.perf_counter()
+print((imported - start) * 1000, (constructed - imported) * 1000, (rendered - constructed) * 1000, (warm - rendered) * 1000)
+"""
+
+CONFIG = """title: Startup
+sections:
+  - type: header
+    content: Welcome
+  - type: paragraph
+    content: A short paragraph for a small email.
+  - type: list
+    items: [One, Two, Three]
+  - type: footer
+    content: Thanks for reading
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure import, construct and render time in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=20, help="Fresh interpreters to start (default: 20)")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    samples = {"import_ms": [], "construct_ms": [], "render_ms": [], "warm_construct_render_ms": [], "process_ms": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "config.yaml")
+        with open(config, "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+        code = CHILD.format(root=ROOT, config=config, output=os.path.join(tmp, "out.html"))
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, cwd=tmp)
+            samples["process_ms"].append((time.perf_counter() - start) * 1000)
+            for key, value in zip(("import_ms", "construct_ms", "render_ms", "warm_construct_render_ms"), result.stdout.split()):
+                samples[key].append(float(value))
+            leftovers = sorted(set(os.listdir(tmp)) - {"config.yaml"})
+            if leftovers:
+                raise SystemExit(f"Constructing and rendering created files: {leftovers}")
+
+    result = {key: round(statistics.median(values), 3) for key, values in samples.items()}
+    result["import_construct_render_ms"] = round(result["import_ms"] + result["construct_ms"] + result["render_ms"], 3)
+    result["runs"] = args.runs
+    for key, value in result.items():
+        print(f"{key:>27}: {value}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
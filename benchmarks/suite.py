@@ -0,0 +1,263 @@
+"""
+Benchmark suite for config loading, image encoding, block building and end-to-end rendering.
+
+Runs every config in samples/ plus synthetic configs (hundreds of sections, blocks with many rows
+and columns, many large images) and measures, for each of load_config (with and without a warm
+ConfigCache), encode_image_base64, build_block_section and generate_html:
+
+- wall time: min, median and mean milliseconds over --repeat runs after one warm-up run
+- memory: peak and retained bytes traced by tracemalloc during one further run, and the number of
+  memory blocks still allocated when it finished
+
+Every run of generate_html and build_block_section starts with an empty image cache, so the numbers
+include encoding. Results are printed as a table and can be written as JSON. A previous JSON file
+can be passed to --compare to fail (exit code 1) when a median time or peak memory grows by more
+than --threshold, for use as a CI regression check. --metrics limits the check, e.g. to peak_bytes
+when the baseline was recorded on a different machine.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--repeat 5] [--json results.json] [--compare baseline.json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Metrics --compare can check: median wall time and peak traced memory
+METRICS = ("median_ms", "peak_bytes")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yaml  # noqa: E402
+from emailer.cache import ImageCache  # noqa: E402
+from emailer.config import ConfigCache  # noqa: E402
+from emailer.generator import EmailHTMLGenerator, section_image_paths  # noqa: E402
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+STYLES = {"background-color": "#ffffff", "color": "#333333", "padding": "20px", "font-size": "16px"}
+
+
+def write_image(path: str, size: int) -> str:
+    """Writes an incompressible image-like file of the given size in 1 MiB pieces."""
+    with open(path, "wb") as f:
+        f.write(PNG_HEADER)
+        remaining = size - len(PNG_HEADER)
+        while remaining > 0:
+            piece = min(remaining, 1024 * 1024)
+            f.write(os.urandom(piece))
+            remaining -= piece
+    return path
+
+
+def many_sections_config(sections: int, icon: str) -> Dict[str, Any]:
+    """Builds a config that cycles through every section type."""
+    templates = [
+        {"type": "header", "content": "Header", "styles": STYLES},
+        {"type": "paragraph", "content": "Line one\nLine two with <b>markup</b>", "styles": STYLES},
+        {"type": "list", "items": [f"Item {i}" for i in range(5)], "styles": STYLES},
+        {"type": "image", "src": icon, "alt": "icon", "width": "80px", "styles": STYLES},
+        {"type": "block", "styles": STYLES, "rows": [{"columns": [
+            {"type": "icon", "src": icon, "alt": "icon", "width": "40px", "styles": {"padding": "10px"}},
+            {"type": "text", "content": "Column text", "styles": {"font-size": "14px"}},
+            {"type": "link", "content": "Open", "href": "https://example.com", "styles": {"border-radius": "5px"}},
+        ]}] * 3},
+    ]
+    return {"title": "Many sections", "sections": [templates[i % len(templates)] for i in range(sections)]}
+
+
+def deep_blocks_config(blocks: int, rows: int, columns: int, icons: List[str]) -> Dict[str, Any]:
+    """Builds a config of block sections with many rows of many columns each."""
+    column_templates = [
+        lambda i: {"type": "icon", "src": icons[i % len(icons)], "alt": f"icon {i}", "width": "40px",
+                   "styles": {"padding": "5px", "width": "10%"}},
+        lambda i: {"type": "text", "content": f"Cell {i} with <i>markup</i>", "styles": {"font-size": "14px"}},
+        lambda i: {"type": "link", "content": f"Link {i}", "href": f"https://example.com/{i}",
+                   "styles": {"background-color-link": "#007BFF", "border-radius": "5px"}},
+    ]
+    sections = []
+    for block in range(blocks):
+        sections.append({"type": "block", "styles": STYLES, "rows": [
+            {"styles": {"padding": "4px"}, "columns": [
+                column_templates[(row + column) % len(column_templates)](block * rows * columns + row * columns + column)
+                for column in range(columns)]}
+            for row in range(rows)]})
+    return {"title": "Deep blocks", "sections": sections}
+
+
+def large_images_config(images: List[str]) -> Dict[str, Any]:
+    """Builds a config with one image section per large image."""
+    return {"title": "Large images", "sections": [
+        {"type": "image", "src": image, "alt": f"image {i}", "width": "600px", "styles": STYLES}
+        for i, image in enumerate(images)]}
+
+
+def build_cases(tmp: str, quick: bool) -> Dict[str, str]:
+    """Returns config files by case name: every sample plus the synthetic configs."""
+    cases = {f"sample:{os.path.basename(path)}": path for path in sorted(glob.glob(os.path.join(ROOT, "samples", "*.yaml")))}
+
+    icons = [write_image(os.path.join(tmp, f"icon_{i}.png"), 4 * 1024) for i in range(8)]
+    image_size = (1 if quick else 4) * 1024 * 1024
+    images = [write_image(os.path.join(tmp, f"large_{i}.png"), image_size) for i in range(4 if quick else 16)]
+    synthetic = {
+        "synthetic:many-sections": many_sections_config(100 if quick else 500, icons[0]),
+        "synthetic:deep-blocks": deep_blocks_config(5 if quick else 20, 10 if quick else 25, 6, icons),
+        "synthetic:large-images": large_images_config(images),
+    }
+    for name, config in synthetic.items():
+        path = os.path.join(tmp, name.split(":")[1] + ".yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.dump(config, f)
+        cases[name] = path
+    return cases
+
+
+def measure(run: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Times run() repeat times after a warm-up, then traces its memory use on one more run."""
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        result = run()
+        retained, peak = tracemalloc.get_traced_memory()
+        blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    del result
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.mean(times), 3),
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+        "retained_blocks": blocks_after - blocks_before,
+    }
+
+
+def benchmark_case(case: str, config_file: str, tmp: str, repeat: int) -> List[Dict[str, Any]]:
+    """Runs every benchmark that applies to a config."""
+    output_file = os.path.join(tmp, "out.html")
+    generator = EmailHTMLGenerator(config_file, output_file)
+    cwd = os.getcwd()
+    # Sample configs reference their images relative to the repository root
+    os.chdir(ROOT)
+    try:
+        benchmarks: Dict[str, Callable[[], Any]] = {"load_config": generator.load_config}
+        # Every run after the warm-up finds the parsed config in the cache
+        benchmarks["load_config_cached"] = EmailHTMLGenerator(config_file, output_file, config_cache=ConfigCache()).load_config
+
+        images = list(dict.fromkeys(
+            path for section in generator.config.get("sections", []) for path in section_image_paths(section)
+            if os.path.exists(path)))
+        if images:
+            benchmarks["encode_image_base64"] = lambda: [EmailHTMLGenerator.encode_image_base64(path) for path in images]
+
+        blocks = [section for section in generator.config.get("sections", []) if section.get("type") == "block"]
+        if blocks:
+            def build_blocks():
+                generator.image_cache = ImageCache()
+                return [generator.build_block_section(section, "; ".join(
+                    f"{k}: {v}" for k, v in section.get("styles", {}).items() if k != "width"),
+                    section.get("styles", {}).get("width", "100%")) for section in blocks]
+            benchmarks["build_block_section"] = build_blocks
+
+        def generate_html():
+            generator.image_cache = ImageCache()
+            generator.generate_html()
+        benchmarks["generate_html"] = generate_html
+
+        results = []
+        for name, run in benchmarks.items():
+            result = {"case": case, "benchmark": name}
+            result.update(measure(run, repeat))
+            results.append(result)
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: str, threshold: float, min_delta_ms: float,
+            metrics: Sequence[str] = METRICS) -> List[str]:
+    """Returns a description of every compared metric, median time or peak memory, that regressed beyond the threshold."""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = {(item["case"], item["benchmark"]): item for item in json.load(f)["results"]}
+    regressions = []
+    for item in results:
+        previous = baseline.get((item["case"], item["benchmark"]))
+        if previous is None:
+            continue
+        for metric in metrics:
+            old, new = previous[metric], item[metric]
+            # Sub-millisecond timings are too noisy to compare by ratio alone
+            if metric == "median_ms" and new - old < min_delta_ms:
+                continue
+            if old and new > old * (1 + threshold):
+                regressions.append(f"{item['case']} {item['benchmark']} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark config loading, encoding and rendering at scale.")
+    parser.add_argument("--quick", action="store_true", help="Smaller synthetic configs and images, e.g. for CI")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (default: 5)")
+    parser.add_argument("--cases", type=str, default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative growth before a regression is reported (default: 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore time regressions smaller than this many milliseconds (default: 1)")
+    parser.add_argument("--metrics", type=str, default=",".join(METRICS),
+                        help="Comma separated metrics checked by --compare; peak_bytes alone does not depend on the machine's speed "
+                             f"(default: {','.join(METRICS)})")
+    args = parser.parse_args(argv)
+    logging.getLogger(EmailHTMLGenerator.__name__).disabled = True
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for case, config_file in build_cases(tmp, args.quick).items():
+            if args.cases and args.cases not in case:
+                continue
+            results.extend(benchmark_case(case, config_file, tmp, args.repeat))
+
+    print(f"{'case':<42} {'benchmark':<20} {'median ms':>10} {'min ms':>10} {'peak KiB':>10} {'retained KiB':>13}")
+    for item in results:
+        print(f"{item['case']:<42} {item['benchmark']:<20} {item['median_ms']:>10.2f} {item['min_ms']:>10.2f} "
+              f"{item['peak_bytes'] / 1024:>10.0f} {item['retained_bytes'] / 1024:>13.0f}")
+
+    if args.json:
+        report = {
+            "meta": {"python": platform.python_version(), "platform": platform.platform(), "quick": args.quick,
+                     "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        metrics = [metric.strip() for metric in args.metrics.split(",") if metric.strip()]
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            parser.error(f"Unknown metrics: {sorted(unknown)}. Expected some of {list(METRICS)}.")
+        regressions = compare(results, args.compare, args.threshold, args.min_delta_ms, metrics)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+
+from .files import atomic_open, atomic_write
+from .images import extension_for, sniff_mime_type
+
+MANIFEST_NAME = "manifest.json"
+HASH_READ_SIZE = 1024 * 1024
+
+
+class AssetStore:
+    """
+    A directory of images stored under content-hash file names, for linking instead of inlining.
+
+    Each distinct image is written once, however many emails or sections use it. A manifest
+    records every stored file (for a CDN upload step) together with the source path, size and
+    modification time it came from, so an unchanged source that is already stored is resolved
+    without reading it again.
+    """
+
+    def __init__(self, assets_dir: str, base_url: str = "", manifest_name: str = MANIFEST_NAME):
+        """
+        Initializes the store, loading the existing manifest if there is one.
+
+        Args:
+            assets_dir (str): Directory that receives the hashed image files and the manifest.
+            base_url (str): URL prefix for the stored files, e.g. "https://cdn.example.com/email".
+                When empty the bare file name is used.
+            manifest_name (str): File name of the manifest inside the assets directory.
+        """
+        self.assets_dir = assets_dir
+        self.base_url = base_url
+        self.manifest_path = os.path.join(assets_dir, manifest_name)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.new_entries: Dict[str, Dict[str, Any]] = {"files": {}, "sources": {}}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__class__.__name__)
+        os.makedirs(assets_dir, exist_ok=True)
+        self.merge_entries(self._read_manifest())
+        self.new_entries = {"files": {}, "sources": {}}
+
+    def url_for(self, image_path: str) -> str:
+        """
+        Stores an image if needed and returns the URL it is served from.
+
+        Args:
+            image_path (str): Path to the source image file.
+
+        Returns:
+            str: The image URL.
+        """
+        return self.url(self.store(image_path))
+
+    def url(self, file_name: str) -> str:
+        """Returns the URL for a stored file name."""
+        return f"{self.base_url.rstrip('/')}/{file_name}" if self.base_url else file_name
+
+    def store(self, image_path: str) -> str:
+        """
+        Copies an image into the store under its content-hash name unless it is already there.
+
+        Args:
+            image_path (str): Path to the source image file.
+
+        Returns:
+            str: The stored file name.
+        """
+        source = os.path.abspath(image_path)
+        st = os.stat(source)
+        with self._lock:
+            known = self.sources.get(source)
+        if (known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns
+                and os.path.exists(os.path.join(self.assets_dir, known["file"]))):
+            return known["file"]
+
+        digest = self.hash_file(source)
+        content_type = sniff_mime_type(source)
+        file_name = f"{digest[:16]}{extension_for(content_type, source)}"
+        target = os.path.join(self.assets_dir, file_name)
+        if not os.path.exists(target):
+            self._copy(source, target)
+
+        file_entry = {
+            "sha256": digest,
+            "size": st.st_size,
+            "content_type": content_type,
+            "url": self.url(file_name),
+        }
+        source_entry = {"file": file_name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        self.merge_entries({"files": {file_name: file_entry}, "sources": {source: source_entry}})
+        return file_name
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Returns the SHA-256 hex digest of a file, read in fixed-size chunks."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_READ_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def merge_entries(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Adds manifest entries, e.g. those produced by another process rendering into the same store.
+
+        Args:
+            entries (Dict[str, Dict[str, Any]]): A mapping with "files" and "sources" sections.
+        """
+        with self._lock:
+            for section in ("files", "sources"):
+                for key, value in entries.get(section, {}).items():
+                    if getattr(self, section).get(key) != value:
+                        getattr(self, section)[key] = value
+                        self.new_entries[section][key] = value
+
+    def drain_new_entries(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the entries added since the last call, and forgets them.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: A mapping with "files" and "sources" sections.
+        """
+        with self._lock:
+            entries, self.new_entries = self.new_entries, {"files": {}, "sources": {}}
+        return entries
+
+    def write_manifest(self) -> None:
+        """Writes the manifest atomically, keeping any entries already on disk."""
+        self.merge_entries(self._read_manifest())
+        with self._lock:
+            manifest = {"base_url": self.base_url, "files": dict(sorted(self.files.items())),
+                        "sources": dict(sorted(self.sources.items()))}
+        atomic_write(self.manifest_path, json.dumps(manifest, indent=2))
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            self.logger.warning(f"Ignoring unreadable asset manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _copy(self, source: str, target: str) -> None:
+        with atomic_open(target, 'wb') as out, open(source, 'rb') as src:
+            shutil.copyfileobj(src, out, HASH_READ_SIZE)
@@ -0,0 +1,296 @@
+import os
+import glob
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .assets import AssetStore
+from .cache import CacheStats, ImageCache, default_image_cache
+from .generator import EmailHTMLGenerator
+from .output import OutputStats
+
+CONFIG_EXTENSIONS = (".yaml", ".yml", ".json")
+
+# Asset store shared by every render in this (worker) process, set up by _init_worker
+_worker_asset_store: Optional[AssetStore] = None
+
+
+@dataclass
+class BatchItemResult:
+    """The outcome of rendering a single config file in a batch."""
+
+    config_file: str
+    output_file: str
+    ok: bool
+    duration: float
+    error: Optional[str] = None
+    cache_stats: CacheStats = field(default_factory=CacheStats)
+    assets: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    output_stats: OutputStats = field(default_factory=OutputStats)
+
+
+@dataclass
+class BatchResult:
+    """Aggregated outcome of a batch run."""
+
+    items: List[BatchItemResult] = field(default_factory=list)
+    wall_time: float = 0.0
+    workers: int = 1
+
+    @property
+    def succeeded(self) -> List[BatchItemResult]:
+        """Returns the items that rendered successfully."""
+        return [item for item in self.items if item.ok]
+
+    @property
+    def failed(self) -> List[BatchItemResult]:
+        """Returns the items that failed to render."""
+        return [item for item in self.items if not item.ok]
+
+    @property
+    def throughput(self) -> float:
+        """Returns the number of configs processed per second of wall time."""
+        return len(self.items) / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        """Returns the image cache counters summed over every item."""
+        total = CacheStats()
+        for item in self.items:
+            total += item.cache_stats
+        return total
+
+    @property
+    def output_stats(self) -> OutputStats:
+        """Returns the output optimizer sizes summed over every item."""
+        total = OutputStats()
+        for item in self.items:
+            total += item.output_stats
+        return total
+
+    def summary(self) -> str:
+        """
+        Builds a human readable summary with one line per config followed by the totals.
+
+        Returns:
+            str: The summary text.
+        """
+        lines = []
+        for item in self.items:
+            if item.ok:
+                lines.append(f"OK    {item.config_file} -> {item.output_file} ({item.duration * 1000:.1f} ms)")
+            else:
+                lines.append(f"FAIL  {item.config_file}: {item.error}")
+        lines.append(
+            f"Rendered {len(self.succeeded)}/{len(self.items)} configs in {self.wall_time:.2f}s "
+            f"({self.throughput:.1f} configs/s, {self.workers} worker{'s' if self.workers != 1 else ''}); "
+            f"{len(self.failed)} failed."
+        )
+        stats = self.cache_stats
+        lines.append(
+            f"Image cache: {stats.hits} hits, {stats.disk_hits} disk hits, "
+            f"{stats.misses} misses, {stats.evictions} evictions."
+        )
+        if self.output_stats.input_bytes:
+            lines.append(self.output_stats.summary())
+        return "\n".join(lines)
+
+
+def discover_configs(source: str) -> List[str]:
+    """
+    Resolves a batch source into a sorted list of config file paths.
+
+    The source can be a directory (all YAML and JSON files directly inside it), a manifest file
+    listing one config path per line (relative paths are resolved against the manifest's
+    directory, blank lines and lines starting with '#' are ignored) or a glob pattern.
+
+    Args:
+        source (str): Directory, manifest file or glob pattern.
+
+    Returns:
+        List[str]: The config file paths to render.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.lower().endswith(CONFIG_EXTENSIONS) and os.path.isfile(os.path.join(source, name))
+        )
+
+    if os.path.isfile(source) and not source.lower().endswith(CONFIG_EXTENSIONS):
+        base_dir = os.path.dirname(source)
+        with open(source, 'r', encoding="UTF-8") as manifest:
+            entries = [line.strip() for line in manifest]
+        return [
+            entry if os.path.isabs(entry) else os.path.join(base_dir, entry)
+            for entry in entries
+            if entry and not entry.startswith("#")
+        ]
+
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def plan_outputs(config_files: Sequence[str], output_dir: str) -> List[Tuple[str, str]]:
+    """
+    Maps each config file to an HTML output path inside the output directory.
+
+    The directory layout below the configs' common parent is mirrored so that configs with
+    the same file name in different directories do not overwrite each other.
+
+    Args:
+        config_files (Sequence[str]): Config file paths.
+        output_dir (str): Directory that receives the rendered HTML files.
+
+    Returns:
+        List[Tuple[str, str]]: (config file, output file) pairs.
+
+    Raises:
+        ValueError: When two configs would be written to the same output file, such as a.yaml and a.json.
+    """
+    if not config_files:
+        return []
+    absolute = [os.path.abspath(path) for path in config_files]
+    root = os.path.commonpath([os.path.dirname(path) for path in absolute])
+    tasks = []
+    planned: Dict[str, str] = {}
+    for config_file, path in zip(config_files, absolute):
+        relative = os.path.splitext(os.path.relpath(path, root))[0] + ".html"
+        output_file = os.path.join(output_dir, relative)
+        key = os.path.normcase(os.path.abspath(output_file))
+        if key in planned:
+            raise ValueError(f"{planned[key]} and {config_file} would both be rendered to {output_file}.")
+        planned[key] = config_file
+        tasks.append((config_file, output_file))
+    return tasks
+
+
+def render_one(
+    config_file: str,
+    output_file: str,
+    generator_options: Optional[Dict[str, Any]] = None,
+    asset_store: Optional[AssetStore] = None,
+    asset_base_url: Optional[str] = None,
+) -> BatchItemResult:
+    """
+    Renders a single config, capturing any error instead of raising it.
+
+    Args:
+        config_file (str): Path to the YAML configuration file.
+        output_file (str): Path to the output HTML file.
+        generator_options (Optional[Dict[str, Any]]): Extra keyword arguments for EmailHTMLGenerator.
+        asset_store (Optional[AssetStore]): When given, images are linked from this store instead of inlined.
+        asset_base_url (Optional[str]): URL prefix for the images linked from this output. The store's own
+            base URL is used when None.
+
+    Returns:
+        BatchItemResult: The outcome of the render, including any asset manifest entries it added.
+    """
+    options = dict(generator_options or {})
+    if asset_store is not None:
+        options.update(image_mode="link", asset_store=asset_store)
+        if asset_base_url is not None:
+            asset_store.base_url = asset_base_url
+    start = time.perf_counter()
+    image_cache = options["image_cache"] if options.get("image_cache") is not None else default_image_cache
+    stats_before = image_cache.stats.copy()
+    output_optimizer = options.get("output_optimizer")
+    output_before = output_optimizer.stats.copy() if output_optimizer is not None else None
+    try:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        EmailHTMLGenerator(config_file, output_file, **options).generate_html()
+        result = BatchItemResult(config_file, output_file, True, time.perf_counter() - start)
+    except Exception as e:
+        result = BatchItemResult(config_file, output_file, False, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    result.cache_stats = image_cache.stats - stats_before
+    if output_optimizer is not None:
+        result.output_stats = output_optimizer.stats - output_before
+    if asset_store is not None:
+        result.assets = asset_store.drain_new_entries()
+    return result
+
+
+def _render_task(task: Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]) -> BatchItemResult:
+    config_file, output_file, generator_options, asset_base_url = task
+    return render_one(config_file, output_file, generator_options, _worker_asset_store, asset_base_url)
+
+
+def relative_asset_url(assets_dir: str, output_file: str) -> str:
+    """Returns the URL of the assets directory relative to the directory of an output file, e.g. "../assets"."""
+    return os.path.relpath(assets_dir, os.path.dirname(output_file) or ".").replace(os.sep, "/")
+
+
+def _init_worker(log_level: int, image_cache_dir: Optional[str] = None, assets_dir: Optional[str] = None) -> None:
+    """Configures the generator logger, the shared image cache and the asset store once per worker process."""
+    global _worker_asset_store
+    default_image_cache.cache_dir = image_cache_dir
+    _worker_asset_store = AssetStore(assets_dir) if assets_dir else None
+    logger = logging.getLogger(EmailHTMLGenerator.__name__)
+    logger.setLevel(log_level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+
+
+def render_batch(
+    config_files: Sequence[str],
+    output_dir: str,
+    workers: Optional[int] = None,
+    log_level: int = logging.WARNING,
+    image_cache_dir: Optional[str] = None,
+    generator_options: Optional[Dict[str, Any]] = None,
+    assets_dir: Optional[str] = None,
+    asset_base_url: Optional[str] = None,
+) -> BatchResult:
+    """
+    Renders many configs in one invocation, spread over a pool of worker processes.
+
+    A config that fails to load or render is recorded as a failure and does not abort the
+    rest of the batch.
+
+    Args:
+        config_files (Sequence[str]): Config file paths to render.
+        output_dir (str): Directory that receives the rendered HTML files.
+        workers (Optional[int]): Number of worker processes. Defaults to the CPU count;
+            a value of 1 renders in the current process with its own image cache, leaving the
+            process-wide cache and the logger untouched.
+        log_level (int): Log level for the generator logger in the workers.
+        image_cache_dir (Optional[str]): Directory for the persistent image cache shared by
+            the workers. Images are still cached in memory per worker when None.
+        generator_options (Optional[Dict[str, Any]]): Extra keyword arguments for every EmailHTMLGenerator.
+        assets_dir (Optional[str]): When given, images are written once to this directory under
+            content-hash names and linked instead of inlined, and a single manifest is written at the end.
+        asset_base_url (Optional[str]): URL prefix for linked images. When None, each output links to
+            assets_dir relative to its own directory, so outputs in mirrored subdirectories still resolve.
+
+    Returns:
+        BatchResult: Per-config results, in input order, and throughput figures.
+    """
+    tasks = [
+        (config_file, output_file, generator_options,
+         relative_asset_url(assets_dir, output_file) if assets_dir and asset_base_url is None else asset_base_url)
+        for config_file, output_file in plan_outputs(config_files, output_dir)
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    start = time.perf_counter()
+
+    if workers == 1:
+        options = dict(generator_options or {})
+        options.setdefault("image_cache", ImageCache(cache_dir=image_cache_dir))
+        asset_store = AssetStore(assets_dir) if assets_dir else None
+        items = [render_one(config_file, output_file, options, asset_store, base_url)
+                 for config_file, output_file, _, base_url in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level, image_cache_dir, assets_dir)) as executor:
+            items = list(executor.map(_render_task, tasks, chunksize=chunksize))
+
+    if assets_dir:
+        asset_store = AssetStore(assets_dir, asset_base_url or "")
+        for item in items:
+            asset_store.merge_entries(item.assets)
+        asset_store.write_manifest()
+
+    return BatchResult(items=items, wall_time=time.perf_counter() - start, workers=workers)
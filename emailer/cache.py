@@ -0,0 +1,184 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, Optional
+
+from .files import atomic_write
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how an ImageCache has been used."""
+
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def copy(self) -> "CacheStats":
+        return CacheStats(**self.as_dict())
+
+    def as_dict(self) -> Dict[str, int]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def __add__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(**{name: value + getattr(other, name) for name, value in self.as_dict().items()})
+
+    def __sub__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(**{name: value - getattr(other, name) for name, value in self.as_dict().items()})
+
+
+class DiskTier:
+    """
+    The optional on-disk tier of a cache: text entries stored under their key's hash in cache_dir.
+
+    Entries are replaced atomically, so the directory can be shared between runs and processes.
+    Subclasses set cache_dir (None disables the tier) and logger, and describe what they store.
+    """
+
+    # File extension, text encoding and description of the stored entries
+    DISK_EXTENSION = ".txt"
+    DISK_ENCODING = "utf-8"
+    DISK_ENTRY = "cache entry"
+
+    cache_dir: Optional[str]
+    logger: logging.Logger
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}{self.DISK_EXTENSION}")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding=self.DISK_ENCODING) as cached:
+                return cached.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, UnicodeDecodeError) as e:
+            # An unreadable entry is a miss; the fresh value written afterwards replaces it
+            self.logger.warning(f"Ignoring unreadable {self.DISK_ENTRY} at {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, text: str) -> None:
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, text)
+        except OSError as e:
+            self.logger.warning(f"Could not persist {self.DISK_ENTRY} to {path}: {e}")
+
+
+class ImageCache(DiskTier):
+    """
+    A cache of Base64 encoded images with a bounded in-memory LRU and an optional on-disk tier.
+
+    Entries are keyed by the absolute image path together with its size and modification
+    time, so an edited image is re-encoded while an unchanged one is encoded only once. The
+    on-disk tier stores the encoded text under the key's hash and can be shared between runs
+    and processes.
+    """
+
+    DISK_EXTENSION = ".b64"
+    DISK_ENCODING = "ascii"
+    DISK_ENTRY = "encoded image"
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, cache_dir: Optional[str] = None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_bytes (int): Upper bound for the encoded text held in memory. Default is 64 MiB.
+            cache_dir (Optional[str]): Directory for the persistent tier. Disabled when None.
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__class__.__name__)
+
+    @staticmethod
+    def key(image_path: str) -> str:
+        """
+        Computes the cache key for an image from its absolute path, size and modification time.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Returns:
+            str: A hex digest identifying this version of the file.
+        """
+        st = os.stat(image_path)
+        identity = f"{os.path.abspath(image_path)}\0{st.st_size}\0{st.st_mtime_ns}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, image_path: str, encoder: Callable[[str], str]) -> str:
+        """
+        Returns the encoded image, calling the encoder only when no tier holds it.
+
+        Args:
+            image_path (str): Path to the image file.
+            encoder (Callable[[str], str]): Function that encodes the image at a path.
+
+        Returns:
+            str: The Base64 encoded image.
+        """
+        key = self.key(image_path)
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return encoded
+
+        encoded = self._read_disk(key)
+        if encoded is not None:
+            with self._lock:
+                self.stats.disk_hits += 1
+        else:
+            encoded = encoder(image_path)
+            with self._lock:
+                self.stats.misses += 1
+            self._write_disk(key, encoded)
+
+        self._store(key, encoded)
+        return encoded
+
+    def clear(self) -> None:
+        """Drops every in-memory entry. The on-disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Returns the number of encoded characters currently held in memory."""
+        return self._size
+
+    def _store(self, key: str, encoded: str) -> None:
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = encoded
+            self._size += len(encoded)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.stats.evictions += 1
+
+
+default_image_cache = ImageCache()
+"""The process-wide cache shared by generators that are not given their own."""
@@ -1,22 +1,208 @@
 import argparse
-from .generator import EmailHTMLGenerator
+import os
+import sys
+from typing import TYPE_CHECKING, Optional
+from .cache import ImageCache
+from .generator import DEFAULT_PREFETCH_WORKERS, EmailHTMLGenerator
 
-def parse_args():
+if TYPE_CHECKING:
+    # Only needed for annotations; the modules are imported when their options are used
+    from .config import ConfigCache
+    from .output import OutputOptimizer
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Generate HTML email from a config file.')
-    parser.add_argument('-c', '--config', type=str, required=True, help='Path to the config file')
-    parser.add_argument('-o', '--output', type=str, required=True, help='Path to the output HTML file')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-c', '--config', type=str, help='Path to the config file')
+    source.add_argument('-b', '--batch', type=str, help='Directory, glob pattern or manifest file of config files to render in one run')
+    parser.add_argument('-o', '--output', type=str, required=True, help='Path to the output HTML file, or .eml file for a MIME message (output directory in batch mode)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Number of worker processes in batch mode (default: CPU count)')
+    parser.add_argument('--image-cache-dir', type=str, default=None, help='Directory for a persistent cache of encoded images shared between runs and processes')
+    parser.add_argument('--config-cache-dir', type=str, default=None, help='Directory for a persistent cache of parsed configs, so unchanged configs are not parsed again in later runs')
+    parser.add_argument('--stream-images-over', type=int, default=None, metavar='BYTES', help='Base64 encode images of at least this size in chunks straight into the output')
+    parser.add_argument('-r', '--recipients', type=str, default=None, help='CSV or JSONL recipients file; renders the config as a mail merge template')
+    parser.add_argument('--name-field', type=str, default=None, help='Recipient field used to name each mail merge output file')
+    parser.add_argument('--shard-index', type=int, default=0, help='Zero-based shard of the recipients handled by this run')
+    parser.add_argument('--shard-count', type=int, default=1, help='Total number of shards the recipients are split into')
+    parser.add_argument('--assets-dir', type=str, default=None, help='Link images from this directory of content-hashed files instead of inlining them')
+    parser.add_argument('--asset-base-url', type=str, default=None, help='URL prefix for linked images (default: path of --assets-dir relative to each output file)')
+    parser.add_argument('--optimize-images', action='store_true', help='Resize and recompress images to their rendered size before embedding (requires Pillow)')
+    parser.add_argument('--image-quality', type=int, default=82, help='Lossy compression quality used by --optimize-images (default: 82)')
+    parser.add_argument('--image-formats', type=str, default='jpeg,png', help='Comma separated candidate formats for --optimize-images out of jpeg, png and webp (default: jpeg,png)')
+    parser.add_argument('--watch', action='store_true', help='Keep running and rebuild the output whenever the config or one of its images changes')
+    parser.add_argument('--watch-interval', type=float, default=0.5, metavar='SECONDS', help='Seconds between checks for changes in --watch mode (default: 0.5)')
+    parser.add_argument('--prefetch-workers', type=int, default=DEFAULT_PREFETCH_WORKERS, help=f'Images loaded and encoded concurrently before assembly; 0 loads them one at a time (default: {DEFAULT_PREFETCH_WORKERS})')
+    parser.add_argument('--optimize-output', action='store_true', help='Collapse whitespace and drop redundant attributes in the HTML, and report the bytes saved')
+    parser.add_argument('--hoist-styles', action='store_true', help='With --optimize-output, move inline styles repeated on several elements into classes in the <style> block')
+    parser.add_argument('--profile', type=str, default=None, metavar='REPORT', help='Write a JSON report of the time, output size and cache use of every step to this file and print the costliest sections')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N', help='Number of sections listed in each --profile ranking (default: 10)')
     # parser.add_argument('-h', '--help', action='help', help='Show this help message and exit')
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+def asset_base_url(args, output_dir: str) -> str:
+    """Returns --asset-base-url, defaulting to the assets directory relative to the output directory."""
+    if args.asset_base_url is not None:
+        return args.asset_base_url
+    return os.path.relpath(args.assets_dir, output_dir or ".").replace(os.sep, "/")
+
+def image_optimizer(args):
+    """Returns the ImageOptimizer requested by --optimize-images, or None."""
+    if not args.optimize_images:
+        return None
+    from .images import ImageOptimizer
+
+    cache_dir = os.path.join(args.image_cache_dir, "optimized") if args.image_cache_dir else None
+    formats = [name.strip().lower() for name in args.image_formats.split(",") if name.strip()]
+    return ImageOptimizer(quality=args.image_quality, formats=formats, cache_dir=cache_dir)
+
+def config_cache(args) -> Optional["ConfigCache"]:
+    """Returns the ConfigCache requested by --config-cache-dir, or None."""
+    if not args.config_cache_dir:
+        return None
+    from .config import ConfigCache
+
+    return ConfigCache(cache_dir=args.config_cache_dir)
+
+def output_optimizer(args) -> Optional["OutputOptimizer"]:
+    """Returns the OutputOptimizer requested by --optimize-output or --hoist-styles, or None."""
+    if not (args.optimize_output or args.hoist_styles):
+        return None
+    from .output import OutputOptimizer
+
+    return OutputOptimizer(hoist_styles=args.hoist_styles)
+
+def generator_options(args) -> dict:
+    """Returns the EmailHTMLGenerator keyword arguments shared by every mode."""
+    return {"stream_images_over": args.stream_images_over, "image_optimizer": image_optimizer(args),
+            "prefetch_workers": args.prefetch_workers, "config_cache": config_cache(args),
+            "output_optimizer": output_optimizer(args)}
+
+def run_batch(args) -> int:
+    """Renders every config matched by --batch and prints a per-file summary."""
+    from .batch import discover_configs, plan_outputs, render_batch
+
+    for flag, given in (("--profile", args.profile), ("--watch", args.watch), ("--recipients", args.recipients)):
+        if given:
+            print(f"{flag} cannot be combined with --batch.", file=sys.stderr)
+            return 1
+    if args.output.lower().endswith(".eml"):
+        print("--batch writes HTML files into the output directory, not .eml messages.", file=sys.stderr)
+        return 1
+    config_files = discover_configs(args.batch)
+    if not config_files:
+        print(f"No config files found for: {args.batch}", file=sys.stderr)
+        return 1
+    try:
+        plan_outputs(config_files, args.output)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    result = render_batch(config_files, args.output, workers=args.workers, image_cache_dir=args.image_cache_dir,
+                          generator_options=generator_options(args),
+                          assets_dir=args.assets_dir,
+                          asset_base_url=args.asset_base_url)
+    print(result.summary())
+    return 1 if result.failed else 0
+
+def run_merge(args) -> int:
+    """Personalizes --config for every record in --recipients and prints a summary."""
+    from .merge import run_merge, run_merge_parallel
+
+    for flag, given in (("--profile", args.profile), ("--watch", args.watch), ("--assets-dir", args.assets_dir),
+                        ("--optimize-output", args.optimize_output), ("--hoist-styles", args.hoist_styles)):
+        if given:
+            print(f"{flag} cannot be combined with --recipients.", file=sys.stderr)
+            return 1
+    if args.output.lower().endswith(".eml"):
+        print("--recipients writes a directory, .zip archive or .jsonl file, not .eml messages.", file=sys.stderr)
+        return 1
+    if args.workers and args.workers > 1 and args.shard_count > 1:
+        print("--workers cannot be combined with --shard-count; run one process per shard instead.", file=sys.stderr)
+        return 1
+    options = generator_options(args)
+    if args.workers and args.workers > 1:
+        result = run_merge_parallel(args.config, args.recipients, args.output, args.workers, name_field=args.name_field,
+                                    generator_options=options, image_cache_dir=args.image_cache_dir)
+    else:
+        if args.image_cache_dir:
+            options["image_cache"] = ImageCache(cache_dir=args.image_cache_dir)
+        result = run_merge(args.config, args.recipients, args.output, name_field=args.name_field,
+                           shard_index=args.shard_index, shard_count=args.shard_count, generator_options=options)
+    print(result.summary())
+    return 1 if result.failed else 0
 
-def main() -> None:    
-    args = parse_args()
+def run_watch(args, options: dict) -> int:
+    """Renders --config to --output and keeps rebuilding it as the config or its images change."""
+    from .watch import Watcher
+
+    if args.output.lower().endswith(".eml"):
+        print("--watch writes HTML output only.", file=sys.stderr)
+        return 1
+    if args.assets_dir:
+        from .assets import AssetStore
+
+        options["image_mode"] = "link"
+        options["asset_store"] = AssetStore(args.assets_dir, asset_base_url(args, os.path.dirname(args.output)))
+    Watcher(args.config, args.output, **options).run(args.watch_interval)
+    return 0
+
+def render_config(args, options: dict) -> None:
+    """Renders --config to --output as HTML, or as a MIME message when the output ends in .eml."""
     config_file = args.config
     html_output_file = args.output
 
     # Create an instance of the class and generate the HTML
-    email_generator = EmailHTMLGenerator(config_file, html_output_file)
+    if html_output_file.lower().endswith(".eml"):
+        from .mime import generate_eml
+
+        email_generator = EmailHTMLGenerator(config_file, html_output_file, image_mode="cid", **options)
+        generate_eml(email_generator, html_output_file)
+        return
+
+    if args.assets_dir:
+        from .assets import AssetStore
+
+        asset_store = AssetStore(args.assets_dir, asset_base_url(args, os.path.dirname(html_output_file)))
+        email_generator = EmailHTMLGenerator(config_file, html_output_file, image_mode="link", asset_store=asset_store,
+                                             **options)
+        email_generator.generate_html()
+        asset_store.write_manifest()
+        return
+
+    email_generator = EmailHTMLGenerator(config_file, html_output_file, **options)
     email_generator.generate_html()
 
+def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    if args.batch:
+        sys.exit(run_batch(args))
+
+    if args.recipients:
+        sys.exit(run_merge(args))
+
+    options = generator_options(args)
+    options["image_cache"] = ImageCache(cache_dir=args.image_cache_dir) if args.image_cache_dir else None
+    if args.watch:
+        sys.exit(run_watch(args, options))
+
+    profiler = None
+    if args.profile:
+        from .profiling import Profiler
+
+        profiler = Profiler()
+        options["hooks"] = [profiler]
+    try:
+        render_config(args, options)
+    finally:
+        # A failed render is still profiled, so the report shows the step that raised
+        if profiler is not None:
+            profiler.write_json(args.profile)
+    if options["output_optimizer"] is not None:
+        print(options["output_optimizer"].stats.summary())
+    if profiler is not None:
+        print(profiler.table(args.profile_top))
+
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from .cache import CacheStats, DiskTier
+
+JSON_EXTENSIONS = (".json",)
+# Loading JSON is roughly 50 times faster per byte than parsing YAML, even with libyaml, so a config whose
+# JSON form is larger than this multiple of its file (YAML anchors reused many times) is faster to parse again
+MAX_EXPANSION = 32
+
+
+def yaml_loader() -> type:
+    """Returns the fastest safe YAML loader available: libyaml's CSafeLoader, or the pure Python SafeLoader."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_config(stream: TextIO, config_file: str = "") -> Any:
+    """
+    Parses a config from an open text file, as JSON when the file name ends in .json and as YAML otherwise.
+
+    Args:
+        stream (TextIO): The open config file.
+        config_file (str): The config file name, used to pick the format.
+
+    Returns:
+        Any: The parsed document.
+    """
+    if config_file.lower().endswith(JSON_EXTENSIONS):
+        return json.load(stream)
+    import yaml
+
+    return yaml.load(stream, Loader=yaml_loader())
+
+
+def validate_config(config: Any) -> Dict[str, Any]:
+    """
+    Checks that a parsed document has the shape of an email config.
+
+    Args:
+        config (Any): The parsed document.
+
+    Returns:
+        Dict[str, Any]: The config, unchanged.
+
+    Raises:
+        ValueError: When the document is not a mapping or its sections are not a list of mappings.
+    """
+    if not isinstance(config, Mapping):
+        raise ValueError(f"The config must be a mapping, not {type(config).__name__}.")
+    sections = config.get("sections", [])
+    if not isinstance(sections, list):
+        raise ValueError(f"'sections' must be a list, not {type(sections).__name__}.")
+    for index, section in enumerate(sections):
+        if not isinstance(section, dict):
+            raise ValueError(f"Section {index} must be a mapping, not {type(section).__name__}.")
+    return config
+
+
+class ConfigCache(DiskTier):
+    """
+    A cache of parsed and validated configs with a bounded in-memory LRU and an optional on-disk tier.
+
+    Entries are keyed by the absolute config path together with its size and modification time,
+    so an edited config is parsed again while an unchanged one is parsed only once. Configs are
+    held as JSON text: turning that back into a config is much faster than parsing YAML, and every
+    caller gets its own copy to modify. The on-disk tier stores the same text under the key's hash
+    and can be shared between runs and processes. Configs that JSON cannot represent exactly, such
+    as YAML dates or numeric keys, are parsed every time, as are configs that expand far beyond their
+    file size through YAML anchors.
+    """
+
+    # Bumped whenever the stored form changes, so older entries are not read
+    VERSION = 1
+    DISK_EXTENSION = ".json"
+    DISK_ENTRY = "parsed config"
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int): Upper bound for the configs held in memory. Default is 256.
+            cache_dir (Optional[str]): Directory for the persistent tier. Disabled when None.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__class__.__name__)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The entries and the lock stay behind so caches can be sent to worker processes
+        return {"max_entries": self.max_entries, "cache_dir": self.cache_dir}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    @classmethod
+    def key(cls, config_file: str) -> str:
+        """
+        Computes the cache key for a config from its absolute path, size and modification time.
+
+        Args:
+            config_file (str): Path to the config file.
+
+        Returns:
+            str: A hex digest identifying this version of the file.
+        """
+        st = os.stat(config_file)
+        identity = f"{cls.VERSION}\0{os.path.abspath(config_file)}\0{st.st_size}\0{st.st_mtime_ns}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, config_file: str, loader: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns the config, calling the loader only when no tier holds it.
+
+        Args:
+            config_file (str): Path to the config file.
+            loader (Callable[[str], Dict[str, Any]]): Function that parses and validates the config at a path.
+
+        Returns:
+            Dict[str, Any]: A fresh copy of the config.
+        """
+        key = self.key(config_file)
+        with self._lock:
+            serialized = self._entries.get(key)
+            if serialized is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return json.loads(serialized)
+
+        serialized = self._read_disk(key)
+        if serialized is not None:
+            try:
+                config = json.loads(serialized)
+            except ValueError as e:
+                self.logger.warning(f"Ignoring corrupt {self.DISK_ENTRY} for {config_file}: {e}")
+            else:
+                with self._lock:
+                    self.stats.disk_hits += 1
+                self._store(key, serialized)
+                return config
+
+        config = loader(config_file)
+        with self._lock:
+            self.stats.misses += 1
+        try:
+            serialized = json.dumps(config, separators=(",", ":"))
+            # Non-string keys would come back as strings, so only configs that survive the round trip are kept
+            exact = json.loads(serialized) == config
+        except (TypeError, ValueError):
+            exact = False
+        if not exact:
+            self.logger.debug(f"Config {config_file} cannot be stored as JSON and will not be cached.")
+            return config
+        if len(serialized) > MAX_EXPANSION * max(os.path.getsize(config_file), 1):
+            self.logger.debug(f"Config {config_file} expands too much to be worth caching.")
+            return config
+        # A file edited while it was parsed may not match the key taken before; store it under neither
+        if self.key(config_file) == key:
+            self._write_disk(key, serialized)
+            self._store(key, serialized)
+        return config
+
+    def clear(self) -> None:
+        """Drops every in-memory entry. The on-disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, serialized: str) -> None:
+        with self._lock:
+            self._entries[key] = serialized
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
@@ -0,0 +1,90 @@
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Union
+
+_umask: Optional[int] = None
+_umask_lock = threading.Lock()
+
+
+def current_umask() -> int:
+    """
+    Returns the process umask without leaving it changed.
+
+    Linux reports it in /proc/self/status; elsewhere it is read by setting and restoring it once,
+    under a lock so threads of this module never see the temporary value.
+
+    Returns:
+        int: The umask, such as 0o022.
+    """
+    global _umask
+    try:
+        with open("/proc/self/status", 'r', encoding='ascii') as status:
+            match = re.search(r"^Umask:\s*([0-7]+)", status.read(), re.MULTILINE)
+        if match:
+            return int(match.group(1), 8)
+    except OSError:
+        pass
+    with _umask_lock:
+        if _umask is None:
+            _umask = os.umask(0o022)
+            os.umask(_umask)
+        return _umask
+
+
+def replace_file(tmp_path: str, path: str) -> None:
+    """
+    Moves a finished temporary file over its destination atomically.
+
+    Files from tempfile.mkstemp are readable by their owner only, so the permissions a plain open()
+    would have given (0o666 less the umask) are applied first.
+
+    Args:
+        tmp_path (str): The temporary file, in the same directory as the destination.
+        path (str): The destination path.
+    """
+    os.chmod(tmp_path, 0o666 & ~current_umask())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', encoding: Optional[str] = 'utf-8') -> Iterator[IO]:
+    """
+    Opens a temporary file next to a destination that replaces it once the block completes.
+
+    Readers, including other processes, see either the previous file or the complete new one, never
+    a partial write. When the block raises, the temporary file is removed and the destination is left
+    untouched.
+
+    Args:
+        path (str): The destination path. Its directory must exist.
+        mode (str): 'w' for text or 'wb' for bytes. Default is 'w'.
+        encoding (Optional[str]): Text encoding, ignored in binary mode. Default is 'utf-8'.
+
+    Yields:
+        IO: The open temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+        replace_file(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path: str, data: Union[str, bytes], mode: str = 'w') -> None:
+    """
+    Writes a whole file atomically, as atomic_open does for streamed content.
+
+    Args:
+        path (str): The destination path. Its directory must exist.
+        data (Union[str, bytes]): The content, text for mode 'w' (written as UTF-8) or bytes for 'wb'.
+        mode (str): 'w' or 'wb'. Default is 'w'.
+    """
+    with atomic_open(path, mode) as f:
+        f.write(data)
@@ -1,46 +1,253 @@
+import io
 import os
-import yaml
+import time
 import base64
-from typing import Dict, Any
+import hashlib
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Any, Iterable, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple, Union
 import logging
 
+from .cache import ImageCache, default_image_cache
+from .config import ConfigCache, parse_config, validate_config
+from .files import atomic_open
+from .hooks import Hook, HookEvent, observed
+from .images import mime_type_from_base64, mime_type_from_bytes, parse_pixels, sniff_mime_type
+
+if TYPE_CHECKING:
+    # Only needed for annotations; importing them eagerly would slow down every import of the generator
+    from .assets import AssetStore
+    from .images import ImageOptimizer
+    from .output import OutputOptimizer
+    from .plan import RenderPlan
+
+# Raw bytes read per step when streaming an image; a multiple of 3 so every chunk encodes without padding
+IMAGE_CHUNK_SIZE = 3 * 64 * 1024
+# Images loaded at the same time before assembly; loading is I/O bound, so this can exceed the CPU count
+DEFAULT_PREFETCH_WORKERS = 8
+
+# Domain part of the Content-IDs given to images attached to MIME messages
+CONTENT_ID_DOMAIN = "emailer.invalid"
+
+# Returns the content of the image at a path as bytes or a readable binary file object, or None when there is none
+AssetResolver = Callable[[str], Union[bytes, bytearray, memoryview, BinaryIO, None]]
+
+
+def iter_base64(data: Union[bytes, bytearray, memoryview], chunk_size: int = IMAGE_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Encodes bytes in Base64 format one aligned chunk at a time.
+
+    Args:
+        data (Union[bytes, bytearray, memoryview]): The bytes to encode.
+        chunk_size (int): Raw bytes per chunk, rounded down to a multiple of 3.
+
+    Yields:
+        str: Consecutive pieces of the Base64 encoded data.
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield base64.b64encode(view[start:start + chunk_size]).decode('ascii')
+
+
+class StreamedImage:
+    """A deferred fragment that Base64 encodes an image into the output only when it is rendered."""
+
+    __slots__ = ("image_path", "data")
+
+    def __init__(self, image_path: str, data: Union[bytes, bytearray, memoryview, None] = None):
+        self.image_path = image_path
+        self.data = data
+
+    def __iter__(self) -> Iterator[str]:
+        if self.data is not None:
+            return iter_base64(self.data)
+        return EmailHTMLGenerator.iter_image_base64(self.image_path)
+
+    def encoded_size(self) -> int:
+        """Returns the length of the Base64 text the image expands to, without reading it."""
+        size = len(self.data) if self.data is not None else os.path.getsize(self.image_path)
+        return -(-size // 3) * 4
+
+    def __repr__(self) -> str:
+        return f"StreamedImage({self.image_path!r})"
+
+
+# A piece of rendered output: literal HTML, or a deferred fragment that yields HTML when iterated
+Fragment = Union[str, StreamedImage]
+
+
+def flatten_fragments(fragments: Iterable[Fragment]) -> Iterator[str]:
+    """
+    Expands deferred fragments so that only strings are yielded.
+
+    Args:
+        fragments (Iterable[Fragment]): Literal strings and deferred fragments.
+
+    Yields:
+        str: Consecutive pieces of HTML.
+    """
+    for fragment in fragments:
+        if isinstance(fragment, str):
+            yield fragment
+        else:
+            yield from fragment
+
+
+def section_images(section: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Returns the parts of a section that embed an image: an image section itself, or its icon and image columns.
+
+    Args:
+        section (Dict[str, Any]): A section from the config.
+
+    Returns:
+        List[Dict[str, Any]]: The image section or columns in the order they appear.
+    """
+    if section.get("type") == "image":
+        return [section]
+    if section.get("type") != "block":
+        return []
+    return [column for row in section.get("rows", []) for column in row.get("columns", [])
+            if column.get("type") in {"icon", "image"}]
+
+
+def section_image_paths(section: Dict[str, Any]) -> List[str]:
+    """
+    Returns the image files a section references, from an image section or its icon and image columns.
+
+    Args:
+        section (Dict[str, Any]): A section from the config.
+
+    Returns:
+        List[str]: The image paths in the order they appear, which may include missing files.
+    """
+    return [image["src"] for image in section_images(section) if image.get("src")]
+
+
+_logging_configured = False
+
+
+def configure_logging() -> None:
+    """Attaches the console handler to the generator's logger the first time it is called in a process."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logger = logging.getLogger("EmailHTMLGenerator")
+    # Leave a logger that the application has already configured alone
+    if not logger.handlers:
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        console_handler.setFormatter(formatter)
+        logger.addHandler(console_handler)
+
+
+def make_parent_dirs(path: str) -> None:
+    """Creates the directory an output file is written to, if it does not exist yet."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
 
 class EmailHTMLGenerator:
     """A class to generate HTML emails with embedded Base64 images from a YAML configuration."""
 
-    def __init__(self, config_file: str, output_file: str = 'email_template.html'):
+    VALID_SECTIONS = frozenset({"header", "paragraph", "footer", "list", "image", "block"})
+    # "inline" embeds images as Base64 data URIs, "cid" references MIME attachments by Content-ID,
+    # "link" references files copied into an AssetStore
+    IMAGE_MODES = ("inline", "cid", "link")
+
+    def __init__(self, config_file: Optional[str] = None, output_file: str = 'email_template.html', image_cache: Optional[ImageCache] = None,
+                 stream_images_over: Optional[int] = None, image_mode: str = "inline", asset_store: Optional["AssetStore"] = None,
+                 image_optimizer: Optional["ImageOptimizer"] = None, prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+                 hooks: Optional[Sequence[Hook]] = None, config: Optional[Mapping[str, Any]] = None,
+                 asset_resolver: Optional[AssetResolver] = None, config_cache: Optional[ConfigCache] = None,
+                 output_optimizer: Optional["OutputOptimizer"] = None):
         """
-        Initializes the EmailHTMLGenerator with a YAML configuration file and an output file path.
+        Initializes the EmailHTMLGenerator with a YAML or JSON configuration file and an output file path.
 
         Args:
-            config_file (str): Path to the YAML configuration file.
+            config_file (Optional[str]): Path to the YAML or JSON configuration file. Required unless config is given.
             output_file (str): Path to the output HTML file. Default is 'email_template.html'.
+            image_cache (Optional[ImageCache]): Cache for encoded images. Defaults to the cache shared by the whole process.
+            stream_images_over (Optional[int]): Images of at least this many bytes are Base64 encoded in chunks straight
+                into the output instead of being encoded and cached as a whole. Disabled when None.
+            image_mode (str): How image sections, icon columns and image columns reference their images, one of IMAGE_MODES.
+                Default is "inline".
+            asset_store (Optional[AssetStore]): Store that receives linked images. Required when image_mode is "link".
+            image_optimizer (Optional[ImageOptimizer]): Resizes and recompresses images to their rendered size before
+                they are embedded. Images are embedded unchanged when None.
+            prefetch_workers (int): Maximum number of images loaded and encoded concurrently before the sections
+                are assembled. Images are loaded one at a time as each section is built when 0.
+            hooks (Optional[Sequence[Hook]]): Callables that receive a HookEvent with the duration, output size and
+                cache use of loading the config, building each section and column, and encoding each image.
+            config (Optional[Mapping[str, Any]]): The configuration itself, used instead of loading config_file. It is
+                validated like a loaded config.
+            asset_resolver (Optional[AssetResolver]): Supplies image content for the image paths in the config instead
+                of reading them from disk, e.g. from object storage. It returns bytes or a binary file object, or None
+                for a missing image, and is called at most once per image and render. Encodings are not cached.
+            config_cache (Optional[ConfigCache]): Cache of parsed configs, so an unchanged config file is not parsed
+                again. Every load parses the file when None.
+            output_optimizer (Optional[OutputOptimizer]): Minifies the HTML as it is rendered and records the bytes
+                saved in its stats. The HTML is written as built when None.
         """
+        if image_mode not in self.IMAGE_MODES:
+            raise ValueError(f"Invalid image mode: {image_mode}. Expected one of {self.IMAGE_MODES}.")
+        if image_mode == "link" and asset_store is None:
+            raise ValueError("The 'link' image mode requires an asset_store.")
+        if (config_file is None) == (config is None):
+            raise ValueError("Exactly one of config_file and config is required.")
+        if asset_resolver is not None and (image_mode == "link" or image_optimizer is not None):
+            raise ValueError("An asset_resolver cannot be combined with the 'link' image mode or an image_optimizer.")
         self.config_file = config_file
         self.output_file = output_file
+        self.image_cache = image_cache if image_cache is not None else default_image_cache
+        self.stream_images_over = stream_images_over
+        self.image_mode = image_mode
+        self.asset_store = asset_store
+        self.image_optimizer = image_optimizer
+        self.prefetch_workers = prefetch_workers
+        self._resolved_images: Dict[Tuple[str, str], Optional[str]] = {}
+        self._encoded_images: Dict[str, str] = {}
+        self.asset_resolver = asset_resolver
+        self.config_cache = config_cache
+        self.output_optimizer = output_optimizer
+        self._assets: Dict[str, Union[bytes, bytearray, memoryview, None]] = {}
+        self.hooks = list(hooks or [])
+        self.current_section: Optional[int] = None
+        self.inline_images: Dict[str, str] = {}
+        self._inline_image_cids: Dict[str, str] = {}
         self.logger = logging.getLogger(__class__.__name__)
-        self.config = self.load_config()
-        os.makedirs("target", exist_ok=True)
-        
-        # Logging
-        self.logger.setLevel(logging.INFO)
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
-        self.logger.info(f"Initialized with config file: {config_file} and output file: {output_file}")  
+        configure_logging()
+        self.config = self.load_config() if config is None else validate_config(config)
+        self.logger.info(f"Initialized with config file: {config_file or '<in-memory config>'} and output file: {output_file}")  
 
     def load_config(self) -> Dict[str, Any]:
         """
-        Loads the configuration from a YAML file.
+        Loads the configuration from a YAML or JSON file, or from the config cache when the file is unchanged.
 
         Returns:
             Dict[str, Any]: A dictionary containing the configuration data.
         """
+        import yaml
+
         try:
-            with open(self.config_file, 'r', encoding="UTF-8") as file:
-                config = yaml.safe_load(file)
+            with self.observe("load_config", self.config_file) as event:
+                if self.config_cache is None:
+                    config = self.read_config(self.config_file)
+                else:
+                    parsed = []
+
+                    def read(config_file: str) -> Dict[str, Any]:
+                        parsed.append(config_file)
+                        return self.read_config(config_file)
+
+                    config = self.config_cache.get(self.config_file, read)
+                    event.cache_hit = not parsed
+                event.bytes = os.path.getsize(self.config_file)
             self.logger.info("Configuration loaded successfully.")
             return config
         except FileNotFoundError:
@@ -49,10 +256,27 @@ class EmailHTMLGenerator:
         except yaml.YAMLError as e:
             self.logger.error(f"Error parsing YAML file: {e}")
             raise
+        except ValueError as e:
+            self.logger.error(f"Invalid configuration file {self.config_file}: {e}")
+            raise
         except Exception as e:
             self.logger.error(f"Unexpected error: {e}")
             raise
 
+    @staticmethod
+    def read_config(config_file: str) -> Dict[str, Any]:
+        """
+        Parses and validates a configuration file, using the libyaml C loader for YAML when it is installed.
+
+        Args:
+            config_file (str): Path to the YAML or JSON configuration file.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the configuration data.
+        """
+        with open(config_file, 'r', encoding="UTF-8") as file:
+            return validate_config(parse_config(file, config_file))
+
     @staticmethod
     def encode_image_base64(image_path: str) -> str:
         """
@@ -75,9 +299,381 @@ class EmailHTMLGenerator:
             logging.error(f"Unexpected error encoding image: {e}")
             raise
 
+    @staticmethod
+    def iter_image_base64(image_path: str, chunk_size: int = IMAGE_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Encodes an image in Base64 format one aligned chunk at a time.
+
+        The file is read into a single reusable buffer, so memory use is bounded by the chunk size
+        rather than the image size and the full encoded payload never exists as one string.
+
+        Args:
+            image_path (str): Path to the image file.
+            chunk_size (int): Raw bytes per chunk, rounded down to a multiple of 3.
+
+        Yields:
+            str: Consecutive pieces of the Base64 encoded image.
+        """
+        buffer = bytearray(max(3, chunk_size - chunk_size % 3))
+        view = memoryview(buffer)
+        try:
+            with open(image_path, 'rb') as image_file:
+                while True:
+                    # Fill the whole buffer so only the final chunk can need padding
+                    filled = 0
+                    while filled < len(buffer):
+                        read = image_file.readinto(view[filled:])
+                        if not read:
+                            break
+                        filled += read
+                    if not filled:
+                        break
+                    yield base64.b64encode(view[:filled]).decode('ascii')
+                    if filled < len(buffer):
+                        break
+        except FileNotFoundError:
+            logging.error(f"Image file {image_path} not found.")
+            raise
+
+    def iter_image_src(self, image_path: str) -> Iterator[Fragment]:
+        """
+        Streams the value of an image's src attribute according to the image mode.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Yields:
+            Fragment: Consecutive pieces of the src value.
+        """
+        if self.image_mode == "cid":
+            yield f"cid:{self.add_inline_image(image_path)}"
+        elif self.image_mode == "link":
+            yield self.asset_store.url_for(image_path)
+        else:
+            yield from self.iter_image_data_uri(image_path)
+
+    def iter_image_data_uri(self, image_path: str) -> Iterator[Fragment]:
+        """
+        Streams the data URI for an image, deferring large images to chunked encoding when streaming is enabled.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Yields:
+            Fragment: Consecutive pieces of the data URI.
+        """
+        if image_path not in self._encoded_images and self.streams_image(image_path):
+            yield f'data:{self.image_mime_type(image_path)};base64,'
+            yield StreamedImage(image_path, self.load_asset(image_path) if self.asset_resolver is not None else None)
+        else:
+            encoded_image = self.get_encoded_image(image_path)
+            yield f'data:{mime_type_from_base64(encoded_image, image_path)};base64,'
+            yield encoded_image
+
+    def streams_image(self, image_path: str) -> bool:
+        """Returns whether an image is large enough to be encoded in chunks straight into the output."""
+        if self.stream_images_over is None:
+            return False
+        if self.asset_resolver is not None:
+            return len(self.load_asset(image_path)) >= self.stream_images_over
+        return os.path.getsize(image_path) >= self.stream_images_over
+
+    def load_asset(self, image_path: str) -> Union[bytes, bytearray, memoryview, None]:
+        """
+        Returns the content of an image from the asset resolver, asking the resolver only once per render.
+
+        Args:
+            image_path (str): The image path as written in the config.
+
+        Returns:
+            Union[bytes, bytearray, memoryview, None]: The image bytes, or None when the resolver has no such image.
+        """
+        if image_path not in self._assets:
+            data = self.asset_resolver(image_path)
+            if data is not None and not isinstance(data, (bytes, bytearray, memoryview)):
+                # The resolver hands over the file object, so it is closed here once read
+                stream = data
+                try:
+                    data = stream.read()
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+            self._assets[image_path] = data
+        return self._assets[image_path]
+
+    def image_exists(self, image_path: str) -> bool:
+        """Returns whether an image is available, from the asset resolver or on disk."""
+        if self.asset_resolver is not None:
+            return self.load_asset(image_path) is not None
+        return os.path.exists(image_path)
+
+    def image_mime_type(self, image_path: str) -> str:
+        """Returns the MIME type of an image, detected from its content."""
+        if self.asset_resolver is not None:
+            return mime_type_from_bytes(self.load_asset(image_path), image_path)
+        return sniff_mime_type(image_path)
+
+    def open_image(self, image_path: str) -> BinaryIO:
+        """Opens an image for reading, from the asset resolver or on disk."""
+        if self.asset_resolver is not None:
+            return io.BytesIO(self.load_asset(image_path))
+        return open(image_path, 'rb')
+
+    def resolve_image(self, image_path: str, declared_width: Any) -> Optional[str]:
+        """
+        Returns the image file to embed for a reference in the config, using the result of the prefetch when there is one.
+
+        Args:
+            image_path (str): Path to the image file as written in the config.
+            declared_width (Any): The width declared in the config, e.g. "80px", "25%" or "auto".
+
+        Returns:
+            Optional[str]: Path to the (optimized) image to embed, or None when the file does not exist.
+        """
+        key = (image_path, str(declared_width))
+        if key in self._resolved_images:
+            return self._resolved_images[key]
+        if not self.image_exists(image_path):
+            return None
+        return self.optimize_image(image_path, declared_width)
+
+    def prefetch_images(self, sections: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        """
+        Loads, optimizes and encodes every image the sections reference before they are assembled.
+
+        Distinct image files are handled concurrently by up to prefetch_workers threads, so waiting on
+        slow storage overlaps instead of adding up section by section. Assembly then only looks up the
+        results. Missing files are recorded so their sections render the usual "Image not found" text.
+
+        Args:
+            sections (Optional[Iterable[Dict[str, Any]]]): Sections to prefetch for. Defaults to every section in the config.
+        """
+        widths: Dict[str, Dict[str, Any]] = {}
+        for section in self.config.get("sections", []) if sections is None else sections:
+            for image in section_images(section):
+                src = image.get("src", "")
+                widths.setdefault(src, {})[str(image.get("width", "100%"))] = image.get("width", "100%")
+        if not widths:
+            return
+        with self.observe("prefetch_images", f"{len(widths)} images"):
+            self._prefetch(widths)
+
+    def _prefetch(self, widths: Dict[str, Dict[str, Any]]) -> None:
+        def prefetch(src: str) -> None:
+            if not self.image_exists(src):
+                for width in widths[src]:
+                    self._resolved_images[(src, width)] = None
+                return
+            for width, declared_width in widths[src].items():
+                path = self.optimize_image(src, declared_width)
+                self._resolved_images[(src, width)] = path
+                if path in self._encoded_images:
+                    continue
+                if self.image_mode == "inline" and not self.streams_image(path):
+                    self._encoded_images[path] = self.get_encoded_image(path)
+                elif self.image_mode == "link":
+                    self.asset_store.url_for(path)
+
+        if self.prefetch_workers <= 1 or len(widths) == 1:
+            for src in widths:
+                prefetch(src)
+            return
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(self.prefetch_workers, len(widths))) as executor:
+            # Iterating the results re-raises the first error, as loading during assembly would
+            for _ in executor.map(prefetch, widths):
+                pass
+
+    def optimize_image(self, image_path: str, declared_width: Any) -> str:
+        """
+        Returns the image to embed, optimized for its rendered width when an image optimizer is configured.
+
+        Args:
+            image_path (str): Path to the image file.
+            declared_width (Any): The width declared in the config, e.g. "80px", "25%" or "auto".
+
+        Returns:
+            str: Path to the image to embed.
+        """
+        if self.image_optimizer is None:
+            return image_path
+        layout_width = parse_pixels(self.config.get("layout", {"width": "600px"}).get("width", "600px"))
+        display_width = parse_pixels(declared_width, layout_width)
+        if layout_width and (display_width is None or display_width > layout_width):
+            display_width = layout_width
+        return self.image_optimizer.optimize(image_path, display_width)
+
+    def get_encoded_image(self, image_path: str) -> str:
+        """
+        Returns the Base64 encoded image, reusing a cached encoding when the file is unchanged.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Returns:
+            str: The Base64 encoded image as a UTF-8 string.
+        """
+        encoded = self._encoded_images.get(image_path)
+        if encoded is not None:
+            return encoded
+        if self.asset_resolver is not None:
+            with self.observe("encode_image", image_path) as event:
+                encoded = base64.b64encode(self.load_asset(image_path)).decode('ascii')
+                event.bytes = len(encoded)
+                event.cache_hit = False
+            return encoded
+        if not self.hooks:
+            return self.image_cache.get(image_path, self.encode_image_base64)
+
+        misses = []
+
+        def encode(path: str) -> str:
+            misses.append(path)
+            return self.encode_image_base64(path)
+
+        with self.observe("encode_image", image_path) as event:
+            encoded = self.image_cache.get(image_path, encode)
+            event.bytes = len(encoded)
+            event.cache_hit = not misses
+        return encoded
+
+    def emit(self, event: HookEvent) -> None:
+        """
+        Passes an event to every hook.
+
+        Args:
+            event (HookEvent): The measurement to report.
+        """
+        for hook in self.hooks:
+            hook(event)
+
+    @contextmanager
+    def observe(self, name: str, label: str = "") -> Iterator[HookEvent]:
+        """
+        Times the enclosed block and emits it as an event when there are hooks, also when the block raises.
+
+        Args:
+            name (str): The event name.
+            label (str): What the event is about, e.g. a file path.
+
+        Yields:
+            HookEvent: The event, whose bytes and cache_hit the block may fill in.
+        """
+        event = HookEvent(name, label, self.current_section)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            event.duration = time.perf_counter() - start
+            if self.hooks:
+                self.emit(event)
+
     def generate_html(self) -> None:
         """
         Generates an HTML file with embedded Base64 images based on the configuration data.
+
+        The HTML is streamed to a temporary file that replaces the output only once the render has
+        finished, so a render that fails leaves any previous output untouched.
+        """
+        make_parent_dirs(self.output_file)
+        with atomic_open(self.output_file, 'w') as f:
+            self.render_to(f)
+        self.logger.info(f"HTML file generated successfully: {self.output_file}")
+
+    def render_to(self, fileobj: TextIO) -> None:
+        """
+        Writes the HTML email to a text file object section by section, so the complete document
+        is never held in memory.
+
+        Args:
+            fileobj (TextIO): A writable text file object.
+        """
+        write = fileobj.write
+        for chunk in self.iter_html():
+            write(chunk)
+
+    def render_bytes_to(self, fileobj: BinaryIO, encoding: str = 'utf-8') -> None:
+        """
+        Writes the HTML email to a binary file object, such as a response body, encoding it chunk by chunk.
+
+        Args:
+            fileobj (BinaryIO): A writable binary file object.
+            encoding (str): Text encoding of the output. Default is 'utf-8'.
+        """
+        write = fileobj.write
+        for chunk in self.iter_html():
+            write(chunk.encode(encoding))
+
+    def render(self) -> str:
+        """
+        Renders the HTML email in memory.
+
+        Returns:
+            str: The complete HTML document.
+        """
+        return "".join(self.iter_html())
+
+    def render_bytes(self, encoding: str = 'utf-8') -> bytes:
+        """
+        Renders the HTML email in memory as encoded bytes.
+
+        Args:
+            encoding (str): Text encoding of the output. Default is 'utf-8'.
+
+        Returns:
+            bytes: The complete HTML document.
+        """
+        return self.render().encode(encoding)
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Renders the HTML email as a stream of chunks, building each section as it is consumed.
+
+        Yields:
+            str: Consecutive pieces of the HTML document.
+        """
+        return flatten_fragments(self.iter_output_fragments())
+
+    def compile(self, merge_fields: bool = False) -> "RenderPlan":
+        """
+        Compiles the configuration into an immutable render plan that can be rendered many times.
+
+        Every section is built once and adjacent static output is joined, so rendering the plan only
+        writes pre-built strings. Images streamed in chunks stay deferred and are read at render time;
+        all other images are captured as they are now, so recompile after editing the config or assets.
+
+        Args:
+            merge_fields (bool): Whether {{ name }} placeholders in the config become mail merge fields.
+
+        Returns:
+            RenderPlan: The compiled plan.
+        """
+        from .plan import RenderPlan
+
+        return RenderPlan.from_fragments(self.iter_output_fragments(), merge_fields=merge_fields)
+
+    def iter_output_fragments(self) -> Iterator[Fragment]:
+        """
+        Builds the HTML email as a stream of fragments, passed through the output optimizer when there is one.
+
+        Yields:
+            Fragment: Consecutive pieces of the HTML document.
+        """
+        if self.output_optimizer is None:
+            return self.iter_fragments()
+        return self.output_optimizer.optimize(self.iter_fragments())
+
+    def iter_fragments(self) -> Iterator[Fragment]:
+        """
+        Builds the HTML email as a stream of fragments without expanding deferred images.
+
+        Yields:
+            Fragment: Consecutive pieces of the HTML document.
         """
         html_start = """<!DOCTYPE html>
         <html>
@@ -85,8 +681,6 @@ class EmailHTMLGenerator:
             <meta charset="UTF-8">
             <meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
             <title>{title}</title>
-            <style>
-            <title>{title}</title>
             <style>
                 body {{ font-family: Arial, sans-serif; background-color: #f4f4f4; margin: 0; padding: 0; }}
                 .container {{ max-width: {layout_width}; margin: 0 auto; background: #ffffff; border: 1px solid #dddddd; }}
@@ -113,29 +707,47 @@ class EmailHTMLGenerator:
             </html>
         """
 
-        # Initialize the content with the title from the config
-        html_content = html_start.format(title=self.config.get("title", "Email"), layout_width=self.config.get("layout", {"width": "600px"})["width"])
+        self.inline_images = {}
+        self._inline_image_cids = {}
+        self._resolved_images = {}
+        self._encoded_images = {}
+        # Resolved assets outlive the render so MIME output can attach them without resolving them again
+        self._assets = {}
+        if self.prefetch_workers:
+            self.prefetch_images()
+
+        # Start the document with the title from the config
+        yield html_start.format(title=self.config.get("title", "Email"), layout_width=self.config.get("layout", {"width": "600px"})["width"])
 
         # Build sections based on the config
-        for section in self.config.get("sections", []):
-            html_content += self.build_section(section)
+        yield from self.iter_sections()
 
         # Close the HTML content
-        html_content += html_end
+        yield html_end
 
-        # Write the HTML content to the output file
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        self.logger.info(f"HTML file generated successfully: {self.output_file}")
+        # Prefetched encodings are only needed for this render
+        self._resolved_images = {}
+        self._encoded_images = {}
+
+    def iter_sections(self) -> Iterator[Fragment]:
+        """
+        Streams every section in the config in order.
+
+        Yields:
+            Fragment: Consecutive pieces of the sections' HTML content.
+        """
+        for index, section in enumerate(self.config.get("sections", [])):
+            self.current_section = index
+            yield from self.iter_section(section)
+        self.current_section = None
 
     def validate_section(self, section_type: str) -> None:
         """
         Validates the structure of the sections in the configuration.
         This method can be extended to include specific validation rules.
         """
-        valid_sections = {"header", "paragraph", "footer", "list", "image", "block"}
-        if section_type not in valid_sections:
-            self.logger.warning(f"Invalid section type: {section_type}. Expected one of {valid_sections}. Skipping this section.")
+        if section_type not in self.VALID_SECTIONS:
+            self.logger.warning(f"Invalid section type: {section_type}. Expected one of {set(self.VALID_SECTIONS)}. Skipping this section.")
 
     def build_section(self, section: Dict[str, Any]) -> str:
         """
@@ -147,11 +759,23 @@ class EmailHTMLGenerator:
         Returns:
             str: The HTML content for the section.
         """
+        return "".join(flatten_fragments(self.iter_section(section)))
+
+    @observed("section")
+    def iter_section(self, section: Dict[str, Any]) -> Iterator[Fragment]:
+        """
+        Streams a specific section of the HTML content based on the section type and styles.
+
+        Args:
+            section (Dict[str, Any]): A dictionary containing section details such as type, content, and styles.
+
+        Yields:
+            Fragment: Consecutive pieces of the section's HTML content.
+        """
         section_type = section.get("type")
         styles = section.get("styles", {})
         width = styles.get("width", "100%")
         style_str = "; ".join([f"{k}: {v}" for k, v in styles.items() if k != "width"])
-        content = ""
 
         # Validate the section type
         self.validate_section(section_type)
@@ -160,22 +784,20 @@ class EmailHTMLGenerator:
         if section_type in {"header", "paragraph", "footer"}:
             # Replace newlines with <br> tags
             content_details = section.get("content", "").replace("\n", "<br>")
-            content += f'<tr><td class="{section_type}" style="{style_str}" width="{width}">{content_details}</td></tr>'
+            yield f'<tr><td class="{section_type}" style="{style_str}" width="{width}">{content_details}</td></tr>'
 
         elif section_type == "list":
             items = section.get("items", [])
-            content += f'<tr><td class="content" style="{style_str}" width="{width}"><ul style="padding-left: 20px;">'
+            yield f'<tr><td class="content" style="{style_str}" width="{width}"><ul style="padding-left: 20px;">'
             for item in items:
-                content += f'<li style="margin-bottom: 10px;">{item}</li>'
-            content += '</ul></td></tr>'
+                yield f'<li style="margin-bottom: 10px;">{item}</li>'
+            yield '</ul></td></tr>'
 
         elif section_type == "image":
-            content += self.build_image_section(section, style_str, width)
+            yield from self.iter_image_section(section, style_str, width)
 
         elif section_type == "block":
-            content += self.build_block_section(section, style_str, width)
-
-        return content
+            yield from self.iter_block_section(section, style_str, width)
 
 
     def build_image_section(self, section: Dict[str, Any], style_str: str, width: str) -> str:
@@ -190,21 +812,35 @@ class EmailHTMLGenerator:
         Returns:
             str: The HTML content for the image section.
         """
+        return "".join(flatten_fragments(self.iter_image_section(section, style_str, width)))
+
+    @observed("image_section")
+    def iter_image_section(self, section: Dict[str, Any], style_str: str, width: str) -> Iterator[Fragment]:
+        """
+        Streams the HTML content for an image section with embedded Base64 image.
+
+        Args:
+            section (Dict[str, Any]): Section details including the image source, alt text, and width.
+            style_str (str): CSS styles for the section.
+            width (str): Width of the section.
+
+        Yields:
+            Fragment: Consecutive pieces of the image section's HTML content.
+        """
         src = section.get("src", "")
         alt = section.get("alt", "")
         img_width = section.get("width", "100%")
         img_height = section.get("height", "auto")
-        image_content = ""
 
-        if os.path.exists(src):
-            encoded_image = self.encode_image_base64(src)
-            image_content += f'<tr><td class="content" style="{style_str}" width="{width}">'
-            image_content += f'<img src="data:image/jpeg;base64,{encoded_image}" alt="{alt}" width="{img_width}" height="{img_height}"  style="width: {img_width}; height: {img_height};">'
-            image_content += '</td></tr>'
+        src = self.resolve_image(src, img_width)
+        if src is not None:
+            yield f'<tr><td class="content" style="{style_str}" width="{width}">'
+            yield '<img src="'
+            yield from self.iter_image_src(src)
+            yield f'" alt="{alt}" width="{img_width}" height="{img_height}"  style="width: {img_width}; height: {img_height};">'
+            yield '</td></tr>'
         else:
-            image_content += f'<tr><td class="content" style="{style_str}" width="{width}"><p>Image not found: {alt}</p></td></tr>'
-
-        return image_content
+            yield f'<tr><td class="content" style="{style_str}" width="{width}"><p>Image not found: {alt}</p></td></tr>'
 
     def build_block_section(self, section: Dict[str, Any], style_str: str, width: str) -> str:
         """
@@ -218,12 +854,27 @@ class EmailHTMLGenerator:
         Returns:
             str: The HTML content for the block section.
         """
-        block_content = f'<tr><td class="content" style="{style_str}" width="{width}"><table width="100%" cellpadding="0" cellspacing="0" border="0">'
-        
+        return "".join(flatten_fragments(self.iter_block_section(section, style_str, width)))
+
+    @observed("block_section")
+    def iter_block_section(self, section: Dict[str, Any], style_str: str, width: str) -> Iterator[Fragment]:
+        """
+        Streams the HTML content for a block section containing multiple rows and columns.
+
+        Args:
+            section (Dict[str, Any]): Section details including rows and columns data.
+            style_str (str): CSS styles for the section.
+            width (str): Width of the section.
+
+        Yields:
+            Fragment: Consecutive pieces of the block section's HTML content, one column at a time.
+        """
+        yield f'<tr><td class="content" style="{style_str}" width="{width}"><table width="100%" cellpadding="0" cellspacing="0" border="0">'
+
         for row in section.get("rows", []):
             row_styles = row.get("styles", {})
             row_style_str = "; ".join([f"{k}: {v}" for k, v in row_styles.items()])
-            block_content += f'<tr style="{row_style_str}">'
+            yield f'<tr style="{row_style_str}">'
 
             for column in row.get("columns", []):
                 column_type = column.get("type")
@@ -232,18 +883,16 @@ class EmailHTMLGenerator:
                 col_width = column_styles.get("width", "auto")
 
                 if column_type == "icon":
-                    block_content += self.build_icon_column(column, column_style_str, col_width)
+                    yield from self.iter_icon_column(column, column_style_str, col_width)
                 elif column_type == "text":
-                    block_content += f'<td style="{column_style_str}" width="{col_width}">{column.get("content", "")}</td>'
+                    yield f'<td style="{column_style_str}" width="{col_width}">{column.get("content", "")}</td>'
                 elif column_type == "link":
-                    block_content += self.build_link_column(column, column_style_str, col_width)
+                    yield self.build_link_column(column, column_style_str, col_width)
                 elif column_type == "image":
-                    block_content += self.build_image_column(column, column_style_str, col_width)
-
-            block_content += '</tr>'  # Close row
-        block_content += '</table></td></tr>'  # Close block and table
+                    yield from self.iter_image_column(column, column_style_str, col_width)
 
-        return block_content
+            yield '</tr>'  # Close row
+        yield '</table></td></tr>'  # Close block and table
 
     def build_icon_column(self, column: Dict[str, Any], column_style_str: str, col_width: str) -> str:
         """
@@ -257,29 +906,73 @@ class EmailHTMLGenerator:
         Returns:
             str: The HTML content for the icon column.
         """
+        return "".join(flatten_fragments(self.iter_icon_column(column, column_style_str, col_width)))
+
+    @observed("icon_column")
+    def iter_icon_column(self, column: Dict[str, Any], column_style_str: str, col_width: str) -> Iterator[Fragment]:
+        """
+        Streams an icon column with a Base64 encoded image.
+
+        Args:
+            column (Dict[str, Any]): Column details including image source, alt text, and width.
+            column_style_str (str): CSS styles for the column.
+            col_width (str): Width of the column.
+
+        Yields:
+            Fragment: Consecutive pieces of the icon column's HTML content.
+        """
         src = column.get("src", "")
         alt = column.get("alt", "")
         icon_width = column.get("width", "100%")
         icon_height = column.get("height", "auto")
 
-        if os.path.exists(src):
-            encoded_image = self.encode_image_base64(src)
-            return f'<td class="icon" style="{column_style_str}" width="{col_width}"><img src="data:image/jpeg;base64,{encoded_image}" alt="{alt}" width="{icon_width}" height="{icon_height}" style="width: {icon_width}; height: {icon_height};"></td>'
+        src = self.resolve_image(src, icon_width)
+        if src is not None:
+            yield f'<td class="icon" style="{column_style_str}" width="{col_width}"><img src="'
+            yield from self.iter_image_src(src)
+            yield f'" alt="{alt}" width="{icon_width}" height="{icon_height}" style="width: {icon_width}; height: {icon_height};"></td>'
         else:
-            return f'<td class="icon" style="{column_style_str}" width="{col_width}"><p>Image not found: {alt}</p></td>'
+            yield f'<td class="icon" style="{column_style_str}" width="{col_width}"><p>Image not found: {alt}</p></td>'
 
     def build_image_column(self, column: Dict[str, Any], column_style_str: str, col_width: str) -> str:
-        """Builds an image column with a CID reference."""
+        """
+        Builds an image column, referencing its image according to the image mode.
+
+        Args:
+            column (Dict[str, Any]): Column details including image source, alt text, width and height.
+            column_style_str (str): CSS styles for the column.
+            col_width (str): Width of the column.
+
+        Returns:
+            str: The HTML content for the image column.
+        """
+        return "".join(flatten_fragments(self.iter_image_column(column, column_style_str, col_width)))
+
+    @observed("image_column")
+    def iter_image_column(self, column: Dict[str, Any], column_style_str: str, col_width: str) -> Iterator[Fragment]:
+        """
+        Streams an image column, referencing its image according to the image mode like image sections do.
+
+        Args:
+            column (Dict[str, Any]): Column details including image source, alt text, width and height.
+            column_style_str (str): CSS styles for the column.
+            col_width (str): Width of the column.
+
+        Yields:
+            Fragment: Consecutive pieces of the image column's HTML content.
+        """
         src = column.get("src", "")
         alt = column.get("alt", "")
         img_width = column.get("width", "100%")
         img_height = column.get("height", "auto")
 
-        if os.path.exists(src):
-            cid = self.add_inline_image(src)
-            return f'<td class="image" style="{column_style_str}" width="{col_width}"><img src="cid:{cid}" alt="{alt}" width="{img_width}" height="{img_height}" style="width: {img_width}; height: {img_height};"></td>'
+        src = self.resolve_image(src, img_width)
+        if src is not None:
+            yield f'<td class="image" style="{column_style_str}" width="{col_width}"><img src="'
+            yield from self.iter_image_src(src)
+            yield f'" alt="{alt}" width="{img_width}" height="{img_height}" style="width: {img_width}; height: {img_height};"></td>'
         else:
-            return f'<td class="image" style="{column_style_str}" width="{col_width}"><p>Image not found: {alt}</p></td>'
+            yield f'<td class="image" style="{column_style_str}" width="{col_width}"><p>Image not found: {alt}</p></td>'
 
     def add_inline_image(self, image_path: str) -> str:
         """
@@ -291,14 +984,22 @@ class EmailHTMLGenerator:
         Returns:
             str: The Content-ID (CID) for the image.
         """
-        cid = os.path.basename(image_path).replace(".", "_")
+        # Resolver paths are keys rather than files, so only paths on disk are normalized
+        real_path = image_path if self.asset_resolver is not None else os.path.realpath(image_path)
+        if real_path in self._inline_image_cids:
+            return self._inline_image_cids[real_path]
+
+        # Content-IDs are addr-specs (RFC 2392); hashing the path keeps them unique and stable between renders
+        cid = f"{hashlib.sha256(real_path.encode('utf-8')).hexdigest()[:32]}@{CONTENT_ID_DOMAIN}"
         self.inline_images[cid] = image_path
+        self._inline_image_cids[real_path] = cid
         return cid
 
     def get_inline_images(self):
         """Returns the dictionary of inline images with their CIDs and file paths."""
         return self.inline_images
 
+    @observed("link_column")
     def build_link_column(self, column: Dict[str, Any], column_style_str: str, col_width: str) -> str:
         """
         Builds a link column with a styled button.
@@ -0,0 +1,104 @@
+import time
+import functools
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+@dataclass
+class HookEvent:
+    """
+    A measurement of one instrumented step of rendering, passed to every hook of a generator.
+
+    Events are emitted when a step finishes, so the events of nested steps (e.g. the columns of a
+    block section) arrive before the event of the step that contains them, and durations include
+    the time of nested steps. A step that raises still emits its event, with error set, before the
+    exception propagates.
+    """
+
+    name: str
+    label: str = ""
+    section: Optional[int] = None
+    duration: float = 0.0
+    bytes: int = 0
+    cache_hit: Optional[bool] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# A hook receives every event. Hooks may be called from the threads that prefetch images, so they must be thread safe.
+Hook = Callable[[HookEvent], None]
+
+
+def text_size(text: str) -> int:
+    """Returns the UTF-8 size of text, without encoding it when it is plain ASCII."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def fragment_size(fragment: Any) -> int:
+    """Returns the UTF-8 size a fragment renders to, using a deferred fragment's own size when it has one."""
+    if isinstance(fragment, str):
+        return text_size(fragment)
+    return fragment.encoded_size() if hasattr(fragment, "encoded_size") else 0
+
+
+def describe(part: Dict[str, Any]) -> str:
+    """Returns a short label for a section or column, e.g. "image: Hero banner"."""
+    label = part.get("alt") or part.get("src") or ""
+    return f"{part.get('type', '')}: {label}" if label else str(part.get("type", ""))
+
+
+def observed(name: str) -> Callable:
+    """
+    Decorates a generator method that builds part of the email so every call emits a HookEvent.
+
+    The method's first argument must be the section or column it builds. Methods that return a
+    string are timed around the call. Methods that return an iterator of fragments are timed while
+    the fragments are produced, excluding the time the caller spends consuming them, and the event
+    is emitted once the iterator is exhausted or raises. Generators without hooks call the method directly.
+
+    Args:
+        name (str): The event name, e.g. "block_section".
+    """
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, part: Dict[str, Any], *args, **kwargs):
+            if not self.hooks:
+                return method(self, part, *args, **kwargs)
+            event = HookEvent(name, describe(part), self.current_section)
+            start = time.perf_counter()
+            try:
+                result = method(self, part, *args, **kwargs)
+            except Exception as e:
+                event.duration = time.perf_counter() - start
+                event.error = f"{type(e).__name__}: {e}"
+                self.emit(event)
+                raise
+            event.duration = time.perf_counter() - start
+            if isinstance(result, str):
+                event.bytes = text_size(result)
+                self.emit(event)
+                return result
+            return _observe_fragments(self, result, event)
+        return wrapper
+    return decorate
+
+
+def _observe_fragments(generator, fragments: Iterator[Any], event: HookEvent) -> Iterator[Any]:
+    while True:
+        start = time.perf_counter()
+        try:
+            fragment = next(fragments)
+        except StopIteration:
+            event.duration += time.perf_counter() - start
+            break
+        except Exception as e:
+            event.duration += time.perf_counter() - start
+            event.error = f"{type(e).__name__}: {e}"
+            generator.emit(event)
+            raise
+        event.duration += time.perf_counter() - start
+        event.bytes += fragment_size(fragment)
+        yield fragment
+    generator.emit(event)
@@ -0,0 +1,296 @@
+import io
+import os
+import re
+import base64
+import hashlib
+import logging
+import mimetypes
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .files import atomic_write
+
+# Leading bytes that identify the image formats email clients can display
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+HEADER_SIZE = 12
+# The generator has always labelled images as JPEG, so it stays the fallback for unknown data
+DEFAULT_MIME_TYPE = "image/jpeg"
+
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/gif": ".gif", "image/webp": ".webp", "image/bmp": ".bmp"}
+# EXIF tag recording how the camera was held; 1 means the pixels are already upright
+EXIF_ORIENTATION = 0x0112
+PIL_FORMATS = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+def detect_mime_type(header: bytes) -> Optional[str]:
+    """
+    Identifies an image format from its first bytes.
+
+    Args:
+        header (bytes): At least the first 12 bytes of the file.
+
+    Returns:
+        Optional[str]: The MIME type, or None when the format is not recognized.
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    return None
+
+
+def sniff_mime_type(image_path: str) -> str:
+    """
+    Returns the MIME type of an image file from its content, falling back to its extension.
+
+    Args:
+        image_path (str): Path to the image file.
+
+    Returns:
+        str: The MIME type.
+    """
+    with open(image_path, 'rb') as image_file:
+        header = image_file.read(HEADER_SIZE)
+    return mime_type_from_bytes(header, image_path)
+
+
+def mime_type_from_bytes(data, image_path: str = "") -> str:
+    """
+    Returns the MIME type of an image held in memory, falling back to the extension of its path.
+
+    Args:
+        data: The image bytes, or at least their first 12 bytes.
+        image_path (str): Path of the image, used for the extension fallback.
+
+    Returns:
+        str: The MIME type.
+    """
+    return detect_mime_type(bytes(data[:HEADER_SIZE])) or mimetypes.guess_type(image_path)[0] or DEFAULT_MIME_TYPE
+
+
+def mime_type_from_base64(encoded: str, image_path: str = "") -> str:
+    """
+    Returns the MIME type of an already Base64 encoded image without reading the file again.
+
+    Args:
+        encoded (str): The Base64 encoded image.
+        image_path (str): Path of the image, used for the extension fallback.
+
+    Returns:
+        str: The MIME type.
+    """
+    return mime_type_from_bytes(base64.b64decode(encoded[:16]), image_path)
+
+
+def extension_for(mime_type: str, image_path: str = "") -> str:
+    """Returns the file extension for a MIME type, keeping the path's own extension for unknown types."""
+    return EXTENSIONS.get(mime_type) or os.path.splitext(image_path)[1].lower()
+
+
+def parse_pixels(value, reference: Optional[float] = None) -> Optional[float]:
+    """
+    Converts a CSS/HTML width such as "80px", "80" or "25%" into pixels.
+
+    Args:
+        value: The declared width.
+        reference (Optional[float]): Pixel width that percentages are relative to.
+
+    Returns:
+        Optional[float]: The width in pixels, or None when it cannot be determined (e.g. "auto").
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(px|%)?\s*", str(value))
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2)
+    if unit == "%":
+        return number * reference / 100 if reference else None
+    return number
+
+
+def default_cache_dir() -> str:
+    """
+    Returns the per-user directory for optimized images, e.g. ~/.cache/emailer/images.
+
+    Returns:
+        str: $XDG_CACHE_HOME or %LOCALAPPDATA% when set, ~/.cache otherwise, followed by emailer/images.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "emailer", "images")
+
+
+class ImageOptimizer:
+    """
+    Resizes and recompresses images to the size they are displayed at before they are embedded.
+
+    Images are downscaled (never upscaled) to the rendered width times a retina factor, re-encoded
+    in each candidate format with the configured quality, and the smallest result is kept, provided
+    it is smaller than the original. Results are stored in a cache directory keyed by the source
+    content hash and the optimization parameters, so repeated runs reuse them without re-encoding.
+
+    Requires Pillow (``pip install "emailer[images]"``).
+    """
+
+    def __init__(self, quality: int = 82, retina_factor: float = 2.0, formats: Sequence[str] = ("jpeg", "png"),
+                 cache_dir: Optional[str] = None):
+        """
+        Initializes the optimizer.
+
+        Args:
+            quality (int): Lossy compression quality from 1 to 100. Default is 82.
+            retina_factor (float): Multiplier applied to the rendered width for high density screens. Default is 2.
+            formats (Sequence[str]): Candidate output formats out of "jpeg", "png" and "webp". WebP is off by
+                default because desktop Outlook cannot display it.
+            cache_dir (Optional[str]): Directory for optimized images. Defaults to default_cache_dir(), which
+                belongs to the current user.
+        """
+        try:
+            from PIL import Image, ImageOps
+        except ImportError as e:
+            raise ImportError('Image optimization requires Pillow. Install it with: pip install "emailer[images]"') from e
+        unknown = set(formats) - set(PIL_FORMATS)
+        if unknown:
+            raise ValueError(f"Invalid image formats: {sorted(unknown)}. Expected some of {sorted(PIL_FORMATS)}.")
+        self.Image = Image
+        self.ImageOps = ImageOps
+        self.quality = quality
+        self.retina_factor = retina_factor
+        self.formats = tuple(formats)
+        self.cache_dir = cache_dir or default_cache_dir()
+        self._resolved: Dict[Tuple[str, int, int, Optional[int]], str] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__class__.__name__)
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def optimize(self, image_path: str, display_width: Optional[float] = None) -> str:
+        """
+        Returns the path of the optimized image, creating it on the first request.
+
+        Args:
+            image_path (str): Path to the source image file.
+            display_width (Optional[float]): Width in CSS pixels the image is rendered at, if known.
+
+        Returns:
+            str: Path to the optimized image, or the source path when optimizing does not make it smaller.
+        """
+        target_width = int(round(display_width * self.retina_factor)) if display_width else None
+        st = os.stat(image_path)
+        memo_key = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns, target_width)
+        with self._lock:
+            if memo_key in self._resolved:
+                return self._resolved[memo_key]
+
+        # A reference keyed by the source's path, size and mtime lets later runs skip reading the source
+        reference_key = self._key(f"{memo_key}:{self._params}")
+        result = self._read_reference(reference_key, image_path)
+        if result is None:
+            with open(image_path, 'rb') as image_file:
+                data = image_file.read()
+            key = self._key(f"{hashlib.sha256(data).hexdigest()}:{target_width}:{self._params}")
+            result = self._cached(key) or self._optimize(image_path, data, target_width, key)
+            self._write_file(reference_key + ".ref", result.encode("utf-8"))
+
+        with self._lock:
+            self._resolved[memo_key] = result
+        return result
+
+    @property
+    def _params(self) -> str:
+        return f"{self.quality}:{self.retina_factor}:{','.join(self.formats)}"
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _read_reference(self, reference_key: str, image_path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.cache_dir, reference_key + ".ref"), 'r', encoding='utf-8') as reference:
+                path = reference.read()
+        except FileNotFoundError:
+            return None
+        # Whatever a reference names is embedded in the email, so only the source itself or a file
+        # inside the cache is trusted; anything else may have been planted in a shared directory
+        real_path = os.path.realpath(path)
+        cache_dir = os.path.realpath(self.cache_dir)
+        if real_path != os.path.realpath(image_path) and os.path.commonpath([real_path, cache_dir]) != cache_dir:
+            self.logger.warning(f"Ignoring cache reference outside {self.cache_dir}: {path}")
+            return None
+        return path if os.path.exists(path) else None
+
+    def _cached(self, key: str) -> Optional[str]:
+        for extension in EXTENSIONS.values():
+            path = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _write_file(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.cache_dir, name)
+        atomic_write(path, data, 'wb')
+        return path
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pillow and the lock are re-created on unpickling so optimizers can be sent to worker processes
+        return {"quality": self.quality, "retina_factor": self.retina_factor, "formats": self.formats,
+                "cache_dir": self.cache_dir}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def _optimize(self, image_path: str, data: bytes, target_width: Optional[int], key: str) -> str:
+        Image = self.Image
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception as e:
+            self.logger.warning(f"Could not optimize {image_path}, embedding it unchanged: {e}")
+            return image_path
+        if getattr(image, "n_frames", 1) > 1:
+            # Animated images would lose their frames
+            return image_path
+
+        # Re-encoding drops the EXIF orientation, so camera photos are rotated upright before anything else
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        if rotated:
+            image = self.ImageOps.exif_transpose(image)
+
+        if target_width and image.width > target_width:
+            height = max(1, round(image.height * target_width / image.width))
+            image = image.resize((target_width, height), Image.LANCZOS)
+            resized = True
+        else:
+            resized = False
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        best: Optional[Tuple[bytes, str]] = None
+        for name in self.formats:
+            if name == "jpeg" and has_alpha:
+                continue
+            candidate = self._encode(image, name)
+            if best is None or len(candidate) < len(best[0]):
+                best = (candidate, PIL_FORMATS[name])
+
+        if best is None or (len(best[0]) >= len(data) and not resized and not rotated):
+            return image_path
+
+        path = self._write_file(key + EXTENSIONS[best[1]], best[0])
+        self.logger.info(f"Optimized {image_path}: {len(data)} -> {len(best[0])} bytes ({best[1]})")
+        return path
+
+    def _encode(self, image, name: str) -> bytes:
+        buffer = io.BytesIO()
+        if image.mode == "CMYK" and name != "jpeg":
+            image = image.convert("RGB")
+        if name == "jpeg":
+            image.convert("RGB").save(buffer, "JPEG", quality=self.quality, optimize=True, progressive=True)
+        elif name == "webp":
+            image.save(buffer, "WEBP", quality=self.quality, method=6)
+        else:
+            image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
@@ -0,0 +1,403 @@
+import os
+import re
+import csv
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .cache import default_image_cache
+from .files import atomic_open
+from .generator import EmailHTMLGenerator
+from .plan import RenderPlan
+
+# Number of failed recipients whose errors are kept for the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass
+class MergeResult:
+    """Aggregated outcome of a mail merge run."""
+
+    rendered: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    wall_time: float = 0.0
+    outputs: List[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Returns the number of recipients processed per second of wall time."""
+        total = self.rendered + self.failed
+        return total / self.wall_time if self.wall_time > 0 else 0.0
+
+    def record_error(self, index: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((index, error))
+
+    def merge(self, other: "MergeResult") -> None:
+        """Adds the counts of another (shard) result to this one."""
+        self.rendered += other.rendered
+        self.failed += other.failed
+        self.errors.extend(other.errors[:max(0, MAX_REPORTED_ERRORS - len(self.errors))])
+        self.outputs.extend(other.outputs)
+
+    def summary(self) -> str:
+        """
+        Builds a human readable summary of the run.
+
+        Returns:
+            str: The summary text.
+        """
+        lines = [f"FAIL  recipient #{index}: {error}" for index, error in self.errors]
+        if self.failed > len(self.errors):
+            lines.append(f"... and {self.failed - len(self.errors)} more failures")
+        lines.append(
+            f"Merged {self.rendered}/{self.rendered + self.failed} recipients in {self.wall_time:.2f}s "
+            f"({self.throughput:.1f} recipients/s); {self.failed} failed."
+        )
+        lines.append("Output: " + ", ".join(self.outputs))
+        return "\n".join(lines)
+
+
+def iter_recipients(recipients_file: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streams recipient records from a CSV file (with a header row) or a JSONL file.
+
+    Args:
+        recipients_file (str): Path to a .csv, .jsonl or .ndjson file.
+
+    Yields:
+        Dict[str, Any]: One recipient's merge values.
+    """
+    for _, recipient in iter_shard(recipients_file):
+        yield recipient
+
+
+def iter_shard(recipients_file: str, shard_index: int = 0, shard_count: int = 1) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Streams the recipients of one shard together with their zero-based position in the file.
+
+    Records of other shards are skipped before they are decoded: JSONL lines are not parsed and CSV rows
+    are not turned into dicts. Blank lines and rows are not counted as records.
+
+    Args:
+        recipients_file (str): Path to a .csv, .jsonl or .ndjson file.
+        shard_index (int): Zero-based shard number.
+        shard_count (int): Total number of shards.
+
+    Yields:
+        Tuple[int, Dict[str, Any]]: The recipient's position and merge values.
+    """
+    if recipients_file.lower().endswith((".jsonl", ".ndjson")):
+        with open(recipients_file, 'r', encoding="UTF-8") as file:
+            lines = (line for line in file if line.strip())
+            for index, line in enumerate(lines):
+                if index % shard_count == shard_index:
+                    yield index, json.loads(line)
+    else:
+        with open(recipients_file, 'r', encoding="UTF-8", newline="") as file:
+            reader = csv.reader(file)
+            fieldnames = next(reader, None)
+            if fieldnames is None:
+                return
+            rows = (row for row in reader if row)
+            for index, row in enumerate(rows):
+                if index % shard_count == shard_index:
+                    # Same shape as csv.DictReader: extra values under None, missing ones as None
+                    recipient: Dict[Any, Any] = dict(zip(fieldnames, row))
+                    if len(row) > len(fieldnames):
+                        recipient[None] = row[len(fieldnames):]
+                    for key in fieldnames[len(row):]:
+                        recipient[key] = None
+                    yield index, recipient
+
+
+class MergeWriter(ABC):
+    """Base class for mail merge output targets."""
+
+    def __init__(self, output: str, name_field: Optional[str] = None):
+        self.output = output
+        self.name_field = name_field
+        self._names: Set[str] = set()
+        self.logger = logging.getLogger(__class__.__name__)
+
+    def file_name(self, index: int, recipient: Dict[str, Any]) -> str:
+        """
+        Returns the per-recipient file name, taken from the name field when it has a value.
+
+        Names are unique within a run: a recipient whose name field repeats an earlier one, once made
+        safe for file names, gets its position appended instead of overwriting the earlier file.
+
+        Args:
+            index (int): The recipient's position in the recipients file.
+            recipient (Dict[str, Any]): The recipient's merge values.
+
+        Returns:
+            str: A file name claimed for this recipient.
+        """
+        if self.name_field and recipient.get(self.name_field):
+            stem = re.sub(r"[^\w.-]", "_", str(recipient[self.name_field]))
+        else:
+            stem = f"recipient-{index:07d}"
+        name = f"{stem}.html"
+        if self.claim(name):
+            return name
+        taken = name
+        stem = f"{stem}-{index}"
+        name = f"{stem}.html"
+        # A name field may itself end in another recipient's position
+        while not self.claim(name):
+            stem += "_"
+            name = f"{stem}.html"
+        self.logger.warning(f"Recipient #{index} repeats the file name {taken}; writing it as {name}")
+        return name
+
+    def claim(self, name: str) -> bool:
+        """
+        Reserves a file name for this run.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            bool: False when the name was already claimed.
+        """
+        if name in self._names:
+            return False
+        self._names.add(name)
+        return True
+
+    @abstractmethod
+    def write(self, index: int, recipient: Dict[str, Any], plan: RenderPlan) -> None:
+        """
+        Renders one recipient into the output.
+
+        Args:
+            index (int): The recipient's position in the recipients file.
+            recipient (Dict[str, Any]): The recipient's merge values.
+            plan (RenderPlan): The compiled template.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class DirectoryMergeWriter(MergeWriter):
+    """
+    Writes one HTML file per recipient into a directory.
+
+    Shards writing to the same directory pass a shared claims_dir, where every file name is claimed
+    by creating an empty file of that name exclusively, so names repeated across shards are detected.
+    """
+
+    def __init__(self, output: str, name_field: Optional[str] = None, claims_dir: Optional[str] = None):
+        super().__init__(output, name_field)
+        self.claims_dir = claims_dir
+        os.makedirs(output, exist_ok=True)
+
+    def claim(self, name: str) -> bool:
+        if not super().claim(name):
+            return False
+        if self.claims_dir is None:
+            return True
+        try:
+            os.close(os.open(os.path.join(self.claims_dir, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def write(self, index: int, recipient: Dict[str, Any], plan: RenderPlan) -> None:
+        path = os.path.join(self.output, self.file_name(index, recipient))
+        with atomic_open(path, 'w') as f:
+            plan.render_to(f, recipient)
+
+
+class ZipMergeWriter(MergeWriter):
+    """Writes one HTML entry per recipient into a single zip archive."""
+
+    def __init__(self, output: str, name_field: Optional[str] = None):
+        super().__init__(output, name_field)
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        self.archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, index: int, recipient: Dict[str, Any], plan: RenderPlan) -> None:
+        # Render fully before opening the entry so a failed recipient leaves no partial member behind
+        chunks = [chunk.encode('utf-8') for chunk in plan.iter_html(recipient)]
+        with self.archive.open(self.file_name(index, recipient), 'w') as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+class JsonlMergeWriter(MergeWriter):
+    """Writes one {"index", "recipient", "html"} JSON object per line."""
+
+    def __init__(self, output: str):
+        super().__init__(output)
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        self.file = open(output, 'w', encoding='utf-8')
+
+    def write(self, index: int, recipient: Dict[str, Any], plan: RenderPlan) -> None:
+        # JSON string escaping is per character, so each chunk can be escaped on its own
+        escaped = [json.dumps(chunk, ensure_ascii=False)[1:-1] for chunk in plan.iter_html(recipient)]
+        head = json.dumps({"index": index, "recipient": recipient}, ensure_ascii=False)[:-1]
+        self.file.write(f'{head}, "html": "')
+        for chunk in escaped:
+            self.file.write(chunk)
+        self.file.write('"}\n')
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def shard_output(output: str, shard_index: int, shard_count: int) -> str:
+    """
+    Returns the output path for a shard. Directories are shared, archives and JSONL files get a shard suffix.
+
+    Args:
+        output (str): The requested output path.
+        shard_index (int): Zero-based shard number.
+        shard_count (int): Total number of shards.
+
+    Returns:
+        str: The path this shard writes to.
+    """
+    root, extension = os.path.splitext(output)
+    if shard_count == 1 or extension.lower() not in (".zip", ".jsonl"):
+        return output
+    return f"{root}-{shard_index + 1:05d}-of-{shard_count:05d}{extension}"
+
+
+def open_writer(output: str, name_field: Optional[str] = None, claims_dir: Optional[str] = None) -> MergeWriter:
+    """
+    Chooses the output target from the output path: a .zip archive, a .jsonl file or a directory.
+
+    Args:
+        output (str): Output path.
+        name_field (Optional[str]): Recipient field used to name per-recipient files.
+        claims_dir (Optional[str]): Directory where shards sharing an output directory claim file names.
+
+    Returns:
+        MergeWriter: The writer for the output.
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension == ".zip":
+        return ZipMergeWriter(output, name_field)
+    if extension == ".jsonl":
+        return JsonlMergeWriter(output)
+    return DirectoryMergeWriter(output, name_field, claims_dir)
+
+
+def run_merge(
+    config_file: str,
+    recipients_file: str,
+    output: str,
+    name_field: Optional[str] = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    generator_options: Optional[Dict[str, Any]] = None,
+    claims_dir: Optional[str] = None,
+) -> MergeResult:
+    """
+    Personalizes one template for a stream of recipients.
+
+    The template is compiled once, so its static parts, including encoded images, are built a
+    single time; each recipient then only fills in the {{ name }} merge fields. Recipients are read
+    and written one at a time, so memory does not grow with the recipient count. With more than one
+    shard, this call only handles the recipients whose zero-based position modulo shard_count is
+    shard_index.
+
+    Args:
+        config_file (str): Path to the template YAML configuration file.
+        recipients_file (str): Path to the CSV or JSONL recipients file.
+        output (str): Output directory, .zip archive or .jsonl file.
+        name_field (Optional[str]): Recipient field used to name per-recipient files.
+        shard_index (int): Zero-based shard number handled by this call.
+        shard_count (int): Total number of shards.
+        generator_options (Optional[Dict[str, Any]]): Extra keyword arguments for EmailHTMLGenerator.
+        claims_dir (Optional[str]): Directory shared by the shards of a run that write to the same output
+            directory, where file names are claimed so a name repeated in another shard is not overwritten.
+
+    Returns:
+        MergeResult: Counts, sampled errors and throughput for this shard.
+    """
+    start = time.perf_counter()
+    result = MergeResult()
+    plan = EmailHTMLGenerator(config_file, **(generator_options or {})).compile(merge_fields=True)
+    output = shard_output(output, shard_index, shard_count)
+    writer = open_writer(output, name_field, claims_dir)
+    try:
+        for index, recipient in iter_shard(recipients_file, shard_index, shard_count):
+            try:
+                writer.write(index, recipient, plan)
+            except Exception as e:
+                result.record_error(index, f"{type(e).__name__}: {e}")
+            else:
+                result.rendered += 1
+    finally:
+        writer.close()
+    result.outputs.append(output)
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+def _merge_shard(args: Tuple[Any, ...]) -> MergeResult:
+    return run_merge(*args)
+
+
+def _init_worker(image_cache_dir: Optional[str]) -> None:
+    default_image_cache.cache_dir = image_cache_dir
+    logging.getLogger(EmailHTMLGenerator.__name__).setLevel(logging.WARNING)
+
+
+def run_merge_parallel(
+    config_file: str,
+    recipients_file: str,
+    output: str,
+    workers: int,
+    name_field: Optional[str] = None,
+    generator_options: Optional[Dict[str, Any]] = None,
+    image_cache_dir: Optional[str] = None,
+) -> MergeResult:
+    """
+    Runs a mail merge split into one shard per worker process.
+
+    Args:
+        config_file (str): Path to the template YAML configuration file.
+        recipients_file (str): Path to the CSV or JSONL recipients file.
+        output (str): Output directory, .zip archive or .jsonl file.
+        workers (int): Number of worker processes (and shards).
+        name_field (Optional[str]): Recipient field used to name per-recipient files.
+        generator_options (Optional[Dict[str, Any]]): Extra keyword arguments for EmailHTMLGenerator.
+        image_cache_dir (Optional[str]): Directory for the persistent image cache shared by the workers.
+
+    Returns:
+        MergeResult: The combined result of every shard.
+    """
+    start = time.perf_counter()
+    # Shards of a directory output share it, so names taken from a field are claimed in a common directory
+    shared_dir = os.path.splitext(output)[1].lower() not in (".zip", ".jsonl")
+    claims_dir = tempfile.mkdtemp(prefix="emailer-merge-") if shared_dir and name_field else None
+    shards = [(config_file, recipients_file, output, name_field, index, workers, generator_options, claims_dir)
+              for index in range(workers)]
+    result = MergeResult()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(image_cache_dir,)) as executor:
+            for shard_result in executor.map(_merge_shard, shards):
+                result.merge(shard_result)
+    finally:
+        if claims_dir is not None:
+            shutil.rmtree(claims_dir, ignore_errors=True)
+    result.outputs = sorted(set(result.outputs))
+    result.wall_time = time.perf_counter() - start
+    return result
@@ -0,0 +1,230 @@
+import os
+import re
+import uuid
+import base64
+import quopri
+from email.header import Header
+from email.utils import encode_rfc2231, formatdate, make_msgid
+from html.parser import HTMLParser
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Mapping, Optional
+
+from .generator import EmailHTMLGenerator, make_parent_dirs
+
+CRLF = b"\r\n"
+# Raw bytes per Base64 line; 57 bytes encode to the 76 characters allowed by RFC 2045
+BASE64_LINE_BYTES = 57
+IMAGE_READ_SIZE = BASE64_LINE_BYTES * 1024
+# Printable ASCII except the colon (RFC 5322 field names)
+HEADER_NAME_PATTERN = re.compile(r"[!-9;-~]+")
+LINE_BREAK_PATTERN = re.compile(r"[\r\n]+")
+
+
+class Base64LineEncoder:
+    """Base64 encodes a byte stream into CRLF terminated 76 character lines as it is fed."""
+
+    def __init__(self, write: Callable[[bytes], Any]):
+        self.write = write
+        self.pending = b""
+
+    def feed(self, data: bytes) -> None:
+        data = self.pending + data
+        usable = len(data) - len(data) % BASE64_LINE_BYTES
+        if usable:
+            encoded = base64.b64encode(data[:usable])
+            self.write(CRLF.join(encoded[i:i + 76] for i in range(0, len(encoded), 76)) + CRLF)
+        self.pending = data[usable:]
+
+    def close(self) -> None:
+        if self.pending:
+            self.write(base64.b64encode(self.pending) + CRLF)
+            self.pending = b""
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the text of an HTML fragment, turning line breaks and block ends into newlines."""
+
+    BREAKS = {"br", "p", "div", "li", "tr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br":
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.BREAKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(fragment: str) -> str:
+    """
+    Strips the markup from an HTML fragment.
+
+    Args:
+        fragment (str): HTML text such as a paragraph's content.
+
+    Returns:
+        str: The plain text, with one line per line break.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(fragment)
+    extractor.close()
+    lines = (" ".join(line.split()) for line in "".join(extractor.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def iter_plain_text(config: Dict[str, Any]) -> Iterator[str]:
+    """
+    Renders a plain text alternative of an email configuration, one paragraph per section.
+
+    Args:
+        config (Dict[str, Any]): The email configuration.
+
+    Yields:
+        str: The text of each section that has any.
+    """
+    for section in config.get("sections", []):
+        section_type = section.get("type")
+        if section_type in {"header", "paragraph", "footer"}:
+            text = html_to_text(section.get("content", ""))
+        elif section_type == "list":
+            text = "\n".join(f"- {html_to_text(str(item))}" for item in section.get("items", []))
+        elif section_type == "image":
+            text = f"[{section['alt']}]" if section.get("alt") else ""
+        elif section_type == "block":
+            lines = []
+            for row in section.get("rows", []):
+                for column in row.get("columns", []):
+                    if column.get("type") == "text":
+                        lines.append(html_to_text(column.get("content", "")))
+                    elif column.get("type") == "link":
+                        lines.append(f"{html_to_text(column.get('content', ''))}: {column.get('href', '#')}")
+            text = "\n".join(line for line in lines if line)
+        else:
+            text = ""
+        if text:
+            yield text
+
+
+def encode_header(name: str, value: str) -> str:
+    """
+    Formats a header line, folded to at most 78 characters per line and RFC 2047 encoded when needed.
+
+    Line breaks in the value are replaced by spaces, so a value taken from a config cannot start a
+    header of its own.
+
+    Args:
+        name (str): The header name, e.g. "Subject".
+        value (str): The header value.
+
+    Returns:
+        str: The complete header, with CRLF between folded lines but not after the last one.
+
+    Raises:
+        ValueError: When the name is not a valid header name.
+    """
+    if not HEADER_NAME_PATTERN.fullmatch(name):
+        raise ValueError(f"Invalid header name: {name!r}")
+    value = " ".join(LINE_BREAK_PATTERN.split(value))
+    # Plain ASCII stays readable unless a word is too long to fold; anything else becomes encoded words
+    charset = "us-ascii" if value.isascii() and all(len(word) < 900 for word in value.split()) else "utf-8"
+    return f"{name}: {Header(value, charset, header_name=name).encode(linesep=CRLF.decode('ascii'))}"
+
+
+def encode_parameter(name: str, value: str) -> str:
+    """Formats a MIME parameter such as filename, RFC 2231 encoded when the value is not plain ASCII."""
+    if value.isascii() and not LINE_BREAK_PATTERN.search(value):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'{name}="{escaped}"'
+    return f"{name}*={encode_rfc2231(value, 'utf-8')}"
+
+
+def write_eml(generator: EmailHTMLGenerator, fileobj: BinaryIO, headers: Optional[Mapping[str, str]] = None) -> None:
+    """
+    Writes the email as a complete MIME message.
+
+    The message is multipart/alternative with a plain text part and a multipart/related part that
+    holds the HTML and every referenced image. Each distinct image is attached once and referenced
+    by its Content-ID from every place it appears. All parts are Base64 or quoted-printable encoded
+    as they are streamed, so neither the HTML nor any image is held in memory as a whole.
+
+    Args:
+        generator (EmailHTMLGenerator): A generator created with image_mode="cid".
+        fileobj (BinaryIO): A writable binary file object.
+        headers (Optional[Mapping[str, str]]): Extra or overriding headers such as From and To.
+            Subject defaults to the config title.
+    """
+    if generator.image_mode != "cid":
+        raise ValueError("MIME output requires a generator created with image_mode='cid'.")
+
+    write = fileobj.write
+    alternative_boundary = f"=_alt_{uuid.uuid4().hex}"
+    related_boundary = f"=_rel_{uuid.uuid4().hex}"
+
+    message_headers = {
+        "Subject": generator.config.get("title", "Email"),
+        "Date": formatdate(localtime=True),
+        "Message-ID": make_msgid(),
+    }
+    message_headers.update(headers or {})
+    message_headers["MIME-Version"] = "1.0"
+    message_headers["Content-Type"] = f'multipart/alternative; boundary="{alternative_boundary}"'
+    for name, value in message_headers.items():
+        write(encode_header(name, str(value)).encode("ascii") + CRLF)
+    write(CRLF)
+
+    # Plain text alternative
+    write(f"--{alternative_boundary}".encode("ascii") + CRLF)
+    write(b'Content-Type: text/plain; charset="utf-8"' + CRLF)
+    write(b"Content-Transfer-Encoding: quoted-printable" + CRLF + CRLF)
+    plain_text = "\n\n".join(iter_plain_text(generator.config)) + "\n"
+    write(quopri.encodestring(plain_text.encode("utf-8")).replace(b"\n", CRLF))
+    write(CRLF)
+
+    # HTML and its images
+    write(f"--{alternative_boundary}".encode("ascii") + CRLF)
+    write(f'Content-Type: multipart/related; boundary="{related_boundary}"; type="text/html"'.encode("ascii") + CRLF + CRLF)
+    write(f"--{related_boundary}".encode("ascii") + CRLF)
+    write(b'Content-Type: text/html; charset="utf-8"' + CRLF)
+    write(b"Content-Transfer-Encoding: base64" + CRLF + CRLF)
+    encoder = Base64LineEncoder(write)
+    for chunk in generator.iter_html():
+        encoder.feed(chunk.encode("utf-8"))
+    encoder.close()
+
+    for cid, image_path in generator.get_inline_images().items():
+        file_name = os.path.basename(image_path)
+        content_type = generator.image_mime_type(image_path)
+        write(f"--{related_boundary}".encode("ascii") + CRLF)
+        write(f"Content-Type: {content_type}; {encode_parameter('name', file_name)}".encode("ascii") + CRLF)
+        write(b"Content-Transfer-Encoding: base64" + CRLF)
+        write(f"Content-ID: <{cid}>".encode("ascii") + CRLF)
+        write(f"Content-Disposition: inline; {encode_parameter('filename', file_name)}".encode("ascii") + CRLF + CRLF)
+        encoder = Base64LineEncoder(write)
+        with generator.open_image(image_path) as image_file:
+            for chunk in iter(lambda: image_file.read(IMAGE_READ_SIZE), b""):
+                encoder.feed(chunk)
+        encoder.close()
+
+    write(f"--{related_boundary}--".encode("ascii") + CRLF)
+    write(f"--{alternative_boundary}--".encode("ascii") + CRLF)
+
+
+def generate_eml(generator: EmailHTMLGenerator, output_file: str, headers: Optional[Mapping[str, str]] = None) -> None:
+    """
+    Writes the email as a MIME message to an .eml file.
+
+    Args:
+        generator (EmailHTMLGenerator): A generator created with image_mode="cid".
+        output_file (str): Path to the output .eml file.
+        headers (Optional[Mapping[str, str]]): Extra or overriding headers such as From and To.
+    """
+    make_parent_dirs(output_file)
+    with open(output_file, "wb") as f:
+        write_eml(generator, f, headers)
+    generator.logger.info(f"EML file generated successfully: {output_file}")
@@ -0,0 +1,357 @@
+import re
+import threading
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .hooks import fragment_size
+
+if TYPE_CHECKING:
+    from .generator import Fragment
+
+# Gmail clips messages whose HTML is larger than this and hides the rest behind a "View entire message" link
+GMAIL_CLIP_BYTES = 102 * 1024
+
+# Whitespace next to these tags never renders, so it can be dropped rather than collapsed to one space
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "style", "table", "thead", "tbody", "tfoot", "tr", "td", "th",
+    "ul", "ol", "li", "p", "div", "br", "hr", "center", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6",
+))
+
+# Strings at least this long without markup characters are image data and pass through untouched
+OPAQUE_MIN_LENGTH = 1024
+MARKUP_CHARACTERS = re.compile(r"[\s<>\"'&\x00]")
+PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<conditional><!--\[if\b.*?<!\[endif\]-->)
+  | (?P<comment><!--.*?-->)
+  | (?P<raw><(?P<raw_name>pre|textarea|script)\b[^>]*>.*?</(?P=raw_name)\s*>)
+  | (?P<style_open><style\b[^>]*>)(?P<css>.*?)(?P<style_close></style\s*>)
+  | (?P<tag><(?P<closing>/?)(?P<name>[a-zA-Z][\w:-]*)(?P<attributes>(?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*)\s*(?P<self_closing>/?)>)
+  | (?P<declaration><![^>]*>)
+  | (?P<text>[^<]+|<)
+""", re.S | re.I | re.X)
+ATTRIBUTE_PATTERN = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?""")
+DECLARATION_SEPARATOR = re.compile(r";(?![^(]*\))")
+WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class OutputStats:
+    """Sizes of the HTML before and after an OutputOptimizer pass."""
+
+    documents: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    hoisted_styles: int = 0
+    # Documents still larger than GMAIL_CLIP_BYTES after the pass
+    clipped: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        """Returns how many bytes the pass removed."""
+        return self.input_bytes - self.output_bytes
+
+    def copy(self) -> "OutputStats":
+        return OutputStats(**self.as_dict())
+
+    def as_dict(self) -> Dict[str, int]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def __add__(self, other: "OutputStats") -> "OutputStats":
+        return OutputStats(**{name: value + getattr(other, name) for name, value in self.as_dict().items()})
+
+    def __sub__(self, other: "OutputStats") -> "OutputStats":
+        return OutputStats(**{name: value - getattr(other, name) for name, value in self.as_dict().items()})
+
+    def summary(self) -> str:
+        """Returns a one line description of the bytes saved."""
+        percent = self.saved_bytes / self.input_bytes * 100 if self.input_bytes else 0.0
+        line = (f"Output optimizer: {self.input_bytes:,} -> {self.output_bytes:,} bytes "
+                f"(saved {self.saved_bytes:,}, {percent:.1f}%; {self.hoisted_styles} styles hoisted).")
+        if self.clipped:
+            line += (f" {self.clipped} of {self.documents} email{'s' if self.documents != 1 else ''} "
+                     f"still over Gmail's {GMAIL_CLIP_BYTES // 1024} KB clipping limit.")
+        return line
+
+
+def compact_style(style: str) -> str:
+    """
+    Removes the optional whitespace and empty declarations from an inline style.
+
+    Args:
+        style (str): The value of a style attribute, e.g. "color: #333; padding: 10px 20px;".
+
+    Returns:
+        str: The same declarations written compactly, e.g. "color:#333;padding:10px 20px".
+    """
+    declarations = []
+    for declaration in DECLARATION_SEPARATOR.split(style):
+        name, colon, value = declaration.partition(":")
+        name, value = name.strip(), WHITESPACE.sub(" ", value.strip())
+        if name and colon:
+            declarations.append(f"{name}:{value}")
+        elif name:
+            declarations.append(WHITESPACE.sub(" ", name))
+    return ";".join(declarations)
+
+
+def compact_css(css: str) -> str:
+    """Removes comments and optional whitespace from the contents of a <style> element."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = WHITESPACE.sub(" ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    # Inside declaration blocks the space before a colon is optional too; in selectors it is a descendant combinator
+    css = re.sub(r"\{[^{}]*\}", lambda block: re.sub(r"\s+:", ":", block.group()), css)
+    return css.replace(";}", "}").strip()
+
+
+def important(style: str) -> str:
+    """Marks every declaration of a compact style !important, so a class keeps the precedence of the inline style."""
+    return ";".join(declaration if declaration.endswith("!important") else f"{declaration}!important"
+                    for declaration in DECLARATION_SEPARATOR.split(style) if ":" in declaration)
+
+
+class Tag:
+    """A start or end tag whose attributes may still be rewritten."""
+
+    __slots__ = ("name", "closing", "attributes", "self_closing")
+
+    def __init__(self, name: str, closing: bool, attributes: List[List[str]], self_closing: bool):
+        self.name = name
+        self.closing = closing
+        self.attributes = attributes
+        self.self_closing = self_closing
+
+    def get(self, name: str) -> Optional[str]:
+        for attribute in self.attributes:
+            if attribute[0] == name:
+                return attribute[1][1:-1] if attribute[1][:1] in "\"'" else attribute[1]
+        return None
+
+    def set(self, name: str, value: Optional[str]) -> None:
+        """Replaces an attribute, adds it when missing or removes it when value is None."""
+        for index, attribute in enumerate(self.attributes):
+            if attribute[0] == name:
+                if value is None:
+                    del self.attributes[index]
+                else:
+                    attribute[1] = f'"{value}"'
+                return
+        if value is not None:
+            self.attributes.append([name, f'"{value}"'])
+
+    def __str__(self) -> str:
+        attributes = "".join(f" {name}={value}" if value else f" {name}" for name, value in self.attributes)
+        return f"<{'/' if self.closing else ''}{self.name}{attributes}{'/' if self.self_closing else ''}>"
+
+
+class OutputOptimizer:
+    """
+    Shrinks the HTML of an email without changing how it renders.
+
+    The pass collapses whitespace, removes comments, compacts inline styles and the <style> block,
+    and drops redundant attributes (empty style and class attributes and repeated attributes, which
+    browsers ignore). With hoist_styles, inline styles repeated on several elements are replaced by
+    a class defined once in the <style> block, wherever that saves bytes. Hoisted declarations are
+    marked !important so they keep winning over the template's own rules as the inline styles did.
+    Clients that ignore <style> blocks, such as Gmail for non-Google accounts, lose hoisted styles,
+    so hoisting is off by default.
+
+    Conditional comments (<!--[if mso]> ... <![endif]-->) and the contents of <pre>, <textarea> and
+    <script> elements are copied unchanged, as are the HTML attributes (width, cellpadding, border,
+    ...) that Outlook relies on. Image data passes through without being copied or scanned and
+    images streamed in chunks stay deferred, but the markup is buffered until the end of the
+    document so that hoisted classes can be written into the head.
+    """
+
+    def __init__(self, hoist_styles: bool = False, min_repeats: int = 2, class_prefix: str = "s"):
+        """
+        Initializes the optimizer.
+
+        Args:
+            hoist_styles (bool): Whether repeated inline styles are moved into classes. Default is False.
+            min_repeats (int): Occurrences an inline style needs before it is hoisted. Default is 2.
+            class_prefix (str): Prefix of the generated class names. Default is "s".
+        """
+        self.hoist_styles = hoist_styles
+        self.min_repeats = min_repeats
+        self.class_prefix = class_prefix
+        self.stats = OutputStats()
+        self.last_stats = OutputStats()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The counters and the lock stay behind so optimizers can be sent to worker processes
+        return {"hoist_styles": self.hoist_styles, "min_repeats": self.min_repeats, "class_prefix": self.class_prefix}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def optimize_html(self, html: str) -> str:
+        """
+        Optimizes a complete HTML document.
+
+        Args:
+            html (str): The HTML document.
+
+        Returns:
+            str: The optimized document.
+        """
+        return "".join(self.optimize([html]))
+
+    def optimize(self, fragments: Iterable["Fragment"]) -> Iterator["Fragment"]:
+        """
+        Optimizes a stream of fragments, adding the sizes before and after to stats and last_stats.
+
+        Args:
+            fragments (Iterable[Fragment]): The fragments of an HTML document.
+
+        Yields:
+            Fragment: The fragments of the optimized document, with deferred fragments unchanged.
+        """
+        stats = OutputStats(documents=1)
+        fragments = list(fragments)
+        opaque: List["Fragment"] = []
+        markup: List[str] = []
+        for fragment in fragments:
+            stats.input_bytes += fragment_size(fragment)
+            if isinstance(fragment, str) and (len(fragment) < OPAQUE_MIN_LENGTH or MARKUP_CHARACTERS.search(fragment)):
+                markup.append(fragment)
+            else:
+                # Image data is replaced by a numbered placeholder while the markup around it is rewritten
+                markup.append(f"\x00{len(opaque)}\x00")
+                opaque.append(fragment)
+
+        if any("\x00" in fragment for fragment in fragments if isinstance(fragment, str)):
+            # Markup that already contains NUL characters could be confused with placeholders, so it is left as it is
+            parts = fragments
+        else:
+            tokens = self._tokenize("".join(markup))
+            if self.hoist_styles:
+                stats.hoisted_styles = self._hoist(tokens)
+            parts = self._split(self._serialize(tokens), opaque)
+
+        for part in parts:
+            stats.output_bytes += fragment_size(part)
+            yield part
+        stats.clipped = int(stats.output_bytes > GMAIL_CLIP_BYTES)
+        with self._lock:
+            self.stats += stats
+            self.last_stats = stats
+
+    @staticmethod
+    def _split(html: str, opaque: List["Fragment"]) -> List["Fragment"]:
+        parts: List["Fragment"] = []
+        for index, part in enumerate(PLACEHOLDER.split(html)):
+            if index % 2:
+                parts.append(opaque[int(part)])
+            elif part:
+                parts.append(part)
+        return parts
+
+    @staticmethod
+    def _tokenize(html: str) -> List[Union[str, Tag, Tuple[str, str]]]:
+        """Splits a document into verbatim strings, Tags and ("text", text) pairs, compacting as it goes."""
+        tokens: List[Union[str, Tag, Tuple[str, str]]] = []
+        for match in TOKEN_PATTERN.finditer(html):
+            kind = match.lastgroup
+            if kind == "text":
+                tokens.append(("text", match.group("text")))
+            elif kind == "comment":
+                continue
+            elif kind == "style_close":
+                tokens.append(OutputOptimizer._tag(TOKEN_PATTERN.match(match.group("style_open"))))
+                tokens.append(compact_css(match.group("css")))
+                tokens.append(Tag("style", True, [], False))
+            elif kind == "tag":
+                tokens.append(OutputOptimizer._tag(match))
+            else:
+                tokens.append(match.group(0))
+        return tokens
+
+    @staticmethod
+    def _tag(match: "re.Match") -> Tag:
+        attributes: List[List[str]] = []
+        seen = set()
+        for name, value in ATTRIBUTE_PATTERN.findall(match.group("attributes")):
+            lower = name.lower()
+            # Browsers use the first of repeated attributes and ignore the rest
+            if lower in seen:
+                continue
+            seen.add(lower)
+            if lower == "style":
+                quote = value[:1] if value[:1] in "\"'" else '"'
+                style = compact_style(value[1:-1] if value[:1] in "\"'" else value)
+                if not style:
+                    continue
+                value = f"{quote}{style}{quote}"
+            elif lower == "class":
+                classes = " ".join((value[1:-1] if value[:1] in "\"'" else value).split())
+                if not classes:
+                    continue
+                value = f'"{classes}"'
+            attributes.append([name, value])
+        return Tag(match.group("name"), bool(match.group("closing")), attributes, bool(match.group("self_closing")))
+
+    def _hoist(self, tokens: List[Union[str, Tag, Tuple[str, str]]]) -> int:
+        """Moves repeated inline styles into classes in the first <style> element and returns how many were moved."""
+        tags: Dict[str, List[Tag]] = {}
+        used_classes = set()
+        style_index = None
+        for index, token in enumerate(tokens):
+            if not isinstance(token, Tag) or token.closing:
+                continue
+            if token.name.lower() == "style" and style_index is None:
+                style_index = index + 1
+            used_classes.update((token.get("class") or "").split())
+            style = token.get("style")
+            # Entities and angle brackets mean something else inside a <style> element
+            if style and not any(character in style for character in "&<\"'\x00"):
+                tags.setdefault(style, []).append(token)
+        if style_index is None or not isinstance(tokens[style_index], str):
+            return 0
+
+        rules = []
+        counter = 0
+        for style, elements in tags.items():
+            if len(elements) < self.min_repeats:
+                continue
+            name = f"{self.class_prefix}{counter}"
+            while name in used_classes:
+                counter += 1
+                name = f"{self.class_prefix}{counter}"
+            rule = f".{name}{{{important(style)}}}"
+            removed = sum(len(style) + 9 for _ in elements)
+            added = sum(len(name) + (1 if element.get("class") else 9) for element in elements) + len(rule)
+            if added >= removed:
+                continue
+            for element in elements:
+                element.set("style", None)
+                classes = element.get("class")
+                element.set("class", f"{classes} {name}" if classes else name)
+            used_classes.add(name)
+            rules.append(rule)
+            counter += 1
+        tokens[style_index] += "".join(rules)
+        return len(rules)
+
+    @staticmethod
+    def _serialize(tokens: List[Union[str, Tag, Tuple[str, str]]]) -> str:
+        def is_block(token: Any) -> bool:
+            # Verbatim markup (conditional comments, the doctype) behaves like a block for whitespace
+            return token is None or (isinstance(token, Tag) and token.name.lower() in BLOCK_TAGS) or isinstance(token, str)
+
+        output = []
+        for index, token in enumerate(tokens):
+            if isinstance(token, tuple):
+                text = WHITESPACE.sub(" ", token[1])
+                if text.startswith(" ") and is_block(tokens[index - 1] if index else None):
+                    text = text[1:]
+                if text.endswith(" ") and is_block(tokens[index + 1] if index + 1 < len(tokens) else None):
+                    text = text[:-1]
+                output.append(text)
+            else:
+                output.append(str(token))
+        return "".join(output)
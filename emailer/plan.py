@@ -0,0 +1,171 @@
+import re
+import html
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Mapping, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from .generator import Fragment
+
+# Merge placeholders look like {{ first_name }}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+
+
+@dataclass(frozen=True)
+class MergeField:
+    """A placeholder in a compiled plan that is replaced by a per-recipient value at render time."""
+
+    name: str
+
+    @property
+    def placeholder(self) -> str:
+        return "{{ " + self.name + " }}"
+
+    def render(self, values: Optional[Mapping[str, Any]]) -> str:
+        """
+        Returns the HTML-escaped value for this field.
+
+        Args:
+            values (Optional[Mapping[str, Any]]): The recipient's values. When None the placeholder itself is returned.
+
+        Returns:
+            str: The text to write in place of the placeholder.
+        """
+        if values is None:
+            return self.placeholder
+        try:
+            value = values[self.name]
+        except KeyError:
+            raise KeyError(f"No value for merge field '{self.name}'") from None
+        return html.escape("" if value is None else str(value))
+
+
+def split_placeholders(text: str) -> List[Any]:
+    """
+    Splits text into literal strings and MergeField fragments.
+
+    Args:
+        text (str): Text that may contain {{ name }} placeholders.
+
+    Returns:
+        List[Any]: Alternating literal strings and MergeField instances, without empty strings.
+    """
+    parts = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append(MergeField(match.group(1)))
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    return parts
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """
+    An immutable, pre-built rendering of an email configuration.
+
+    The plan is a flat tuple of fragments: static HTML that was built once at compile time,
+    deferred fragments (such as images streamed in chunks) that produce their output at render
+    time and, for mail merges, MergeField placeholders filled from per-recipient values.
+    Rendering a plan therefore only writes strings, without re-walking the configuration.
+    """
+
+    fragments: Tuple["Fragment", ...]
+
+    @classmethod
+    def from_fragments(cls, fragments: Iterable["Fragment"], merge_fields: bool = False) -> "RenderPlan":
+        """
+        Builds a plan from a fragment stream, joining adjacent static fragments into single strings.
+
+        Args:
+            fragments (Iterable[Fragment]): Literal strings and deferred fragments.
+            merge_fields (bool): Whether {{ name }} placeholders in the static output become MergeField fragments.
+
+        Returns:
+            RenderPlan: The compiled plan.
+        """
+        compiled = []
+        pending = []
+
+        def flush():
+            if pending:
+                text = "".join(pending)
+                pending.clear()
+                compiled.extend(split_placeholders(text) if merge_fields else [text])
+
+        for fragment in fragments:
+            if isinstance(fragment, str):
+                pending.append(fragment)
+                continue
+            flush()
+            compiled.append(fragment)
+        flush()
+        return cls(tuple(compiled))
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Returns the distinct merge field names used by the plan, in order of first use."""
+        return tuple(dict.fromkeys(fragment.name for fragment in self.fragments if isinstance(fragment, MergeField)))
+
+    def iter_html(self, values: Optional[Mapping[str, Any]] = None) -> Iterator[str]:
+        """
+        Renders the plan as a stream of chunks.
+
+        Args:
+            values (Optional[Mapping[str, Any]]): Values for the plan's merge fields.
+
+        Yields:
+            str: Consecutive pieces of the HTML document.
+        """
+        for fragment in self.fragments:
+            if isinstance(fragment, str):
+                yield fragment
+            elif isinstance(fragment, MergeField):
+                yield fragment.render(values)
+            else:
+                yield from fragment
+
+    def render_to(self, fileobj: TextIO, values: Optional[Mapping[str, Any]] = None) -> None:
+        """
+        Writes the rendered plan to a text file object.
+
+        Args:
+            fileobj (TextIO): A writable text file object.
+            values (Optional[Mapping[str, Any]]): Values for the plan's merge fields.
+        """
+        write = fileobj.write
+        for chunk in self.iter_html(values):
+            write(chunk)
+
+    def render(self, values: Optional[Mapping[str, Any]] = None) -> str:
+        """
+        Renders the plan into a single string.
+
+        Args:
+            values (Optional[Mapping[str, Any]]): Values for the plan's merge fields.
+
+        Returns:
+            str: The HTML document.
+        """
+        return "".join(self.iter_html(values))
+
+    def write(self, output_file: str, values: Optional[Mapping[str, Any]] = None) -> None:
+        """
+        Renders the plan into an HTML file.
+
+        Args:
+            output_file (str): Path to the output HTML file.
+            values (Optional[Mapping[str, Any]]): Values for the plan's merge fields.
+        """
+        from .generator import make_parent_dirs
+
+        make_parent_dirs(output_file)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            self.render_to(f, values)
+
+    @property
+    def static_size(self) -> int:
+        """Returns the number of characters held by the plan's static fragments."""
+        return sum(len(fragment) for fragment in self.fragments if isinstance(fragment, str))
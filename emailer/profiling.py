@@ -0,0 +1,110 @@
+import json
+import threading
+from typing import Any, Dict, List
+
+from .hooks import HookEvent
+
+
+class Profiler:
+    """
+    A hook that collects every event of a render and summarizes where the time and bytes went.
+
+    Pass an instance in a generator's hooks, render, then call report() or table().
+    """
+
+    def __init__(self):
+        self.events: List[HookEvent] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: HookEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def sections(self) -> List[HookEvent]:
+        """Returns one event per top-level section, in document order."""
+        return sorted((event for event in self.events if event.name == "section" and event.section is not None),
+                      key=lambda event: event.section)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarizes the collected events.
+
+        Returns:
+            Dict[str, Any]: Totals, per-step-name aggregates, image cache use, the sections, the failed steps
+                and every event.
+        """
+        sections = self.sections()
+        steps: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            step = steps.setdefault(event.name, {"count": 0, "duration": 0.0, "bytes": 0, "errors": 0})
+            step["count"] += 1
+            step["duration"] += event.duration
+            step["bytes"] += event.bytes
+            step["errors"] += event.error is not None
+        images = [event for event in self.events if event.name == "encode_image"]
+        return {
+            "total": {
+                "sections": len(sections),
+                "duration": sum(event.duration for event in sections),
+                "bytes": sum(event.bytes for event in sections),
+            },
+            "steps": steps,
+            "image_cache": {
+                "hits": sum(1 for event in images if event.cache_hit),
+                "misses": sum(1 for event in images if event.cache_hit is False),
+            },
+            "sections": [event.as_dict() for event in sections],
+            "errors": [event.as_dict() for event in self.events if event.error is not None],
+            "events": [event.as_dict() for event in self.events],
+        }
+
+    def write_json(self, path: str) -> None:
+        """Writes the report to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def table(self, top: int = 10) -> str:
+        """
+        Builds a text table of the costliest sections, once by time and once by output size.
+
+        Args:
+            top (int): Number of sections in each ranking.
+
+        Returns:
+            str: The table text.
+        """
+        sections = self.sections()
+        total_time = sum(event.duration for event in sections) or 1.0
+        total_bytes = sum(event.bytes for event in sections) or 1
+        lines = []
+        for title, key in (("time", lambda event: event.duration), ("output bytes", lambda event: event.bytes)):
+            lines.append(f"Top {min(top, len(sections))} sections by {title}:")
+            lines.append(f"  {'#':>4}  {'section':<40} {'ms':>10} {'time %':>7} {'bytes':>12} {'bytes %':>8}")
+            for event in sorted(sections, key=key, reverse=True)[:top]:
+                lines.append(f"  {event.section:>4}  {event.label[:40]:<40} {event.duration * 1000:>10.2f} "
+                             f"{event.duration / total_time * 100:>6.1f}% {event.bytes:>12,} {event.bytes / total_bytes * 100:>7.1f}%")
+            lines.append("")
+        # Images are encoded before assembly, so their cost is listed apart from the sections using them
+        images = sorted((event for event in self.events if event.name == "encode_image"),
+                        key=lambda event: event.duration, reverse=True)[:top]
+        if images:
+            lines.append(f"Top {len(images)} images by encode time:")
+            lines.append(f"  {'image':<46} {'ms':>10} {'bytes':>12} {'cached':>7}")
+            for event in images:
+                lines.append(f"  {event.label[-46:]:<46} {event.duration * 1000:>10.2f} {event.bytes:>12,} "
+                             f"{'yes' if event.cache_hit else 'no':>7}")
+            lines.append("")
+        report = self.report()
+        if report["errors"]:
+            lines.append(f"{len(report['errors'])} failed steps:")
+            for error in report["errors"]:
+                section = "" if error["section"] is None else f"section {error['section']} "
+                lines.append(f"  {section}{error['name']} {error['label']}: {error['error']}")
+            lines.append("")
+        cache = report["image_cache"]
+        steps = report["steps"]
+        lines.append(f"load_config {steps.get('load_config', {}).get('duration', 0.0) * 1000:.2f} ms, "
+                     f"prefetch_images {steps.get('prefetch_images', {}).get('duration', 0.0) * 1000:.2f} ms, "
+                     f"{len(sections)} sections {report['total']['duration'] * 1000:.2f} ms and "
+                     f"{report['total']['bytes']:,} bytes; image cache {cache['hits']} hits, {cache['misses']} misses")
+        return "\n".join(lines)
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .generator import EmailHTMLGenerator, Fragment, section_image_paths
+
+FileStat = Optional[Tuple[int, int]]
+
+
+def file_stat(path: str) -> FileStat:
+    """Returns a file's size and modification time in nanoseconds, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class IncrementalGenerator(EmailHTMLGenerator):
+    """
+    An EmailHTMLGenerator that keeps every rendered section and reuses it while the section's
+    content and the images it references are unchanged.
+
+    Sections are keyed by a hash of their config together with the size and modification time of
+    each referenced image, so editing one section or touching one image re-renders only the
+    sections affected. The output is replaced atomically, so a browser or mail client previewing it
+    never sees a partial file.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.image_mode == "cid":
+            # Content-IDs are assigned while sections render, so reused sections would not register their images
+            raise ValueError("Incremental rendering does not support the 'cid' image mode.")
+        self.fragments: Dict[str, Tuple[Fragment, ...]] = {}
+        self.rendered_sections = 0
+
+    def section_key(self, section: Dict[str, Any]) -> str:
+        """
+        Returns the memo key of a section.
+
+        Args:
+            section (Dict[str, Any]): A section from the config.
+
+        Returns:
+            str: A hash of the section, the layout it is rendered in and the state of its images.
+        """
+        payload = json.dumps([section, self.config.get("layout")], sort_keys=True, default=str)
+        images = [(path, file_stat(path)) for path in section_image_paths(section)]
+        return hashlib.sha256(f"{payload}{images!r}".encode("utf-8")).hexdigest()
+
+    def iter_sections(self):
+        """Streams every section, rendering only those not already memoized under their current key."""
+        fragments: Dict[str, Tuple[Fragment, ...]] = {}
+        self.rendered_sections = 0
+        for index, section in enumerate(self.config.get("sections", [])):
+            self.current_section = index
+            key = self.section_key(section)
+            if key not in fragments:
+                cached = self.fragments.get(key)
+                if cached is None:
+                    cached = tuple(self.iter_section(section))
+                    self.rendered_sections += 1
+                fragments[key] = cached
+            yield from fragments[key]
+        self.current_section = None
+        # Only sections still in the config are kept, so memory follows the current document
+        self.fragments = fragments
+
+    def prefetch_images(self, sections=None) -> None:
+        """Prefetches images only for the sections that are not memoized."""
+        sections = self.config.get("sections", []) if sections is None else sections
+        super().prefetch_images([section for section in sections if self.section_key(section) not in self.fragments])
+
+
+@dataclass
+class RebuildReport:
+    """The outcome of one rebuild in watch mode."""
+
+    changed_files: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    sections: int = 0
+    rendered_sections: int = 0
+    error: Optional[str] = None
+
+    def summary(self) -> str:
+        """Returns a one line description of the rebuild."""
+        changed = ", ".join(self.changed_files) or "initial build"
+        if self.error:
+            return f"FAIL  {changed}: {self.error}"
+        return (f"Rebuilt in {self.duration * 1000:.1f} ms "
+                f"({self.rendered_sections}/{self.sections} sections re-rendered) after: {changed}")
+
+
+class Watcher:
+    """Polls a config file and the images it references, and rebuilds the output whenever one changes."""
+
+    def __init__(self, config_file: str, output_file: str, **generator_options: Any):
+        """
+        Initializes the watcher and loads the config.
+
+        Args:
+            config_file (str): Path to the YAML configuration file.
+            output_file (str): Path to the output HTML file.
+            **generator_options: Extra keyword arguments for the generator, e.g. image_cache or asset_store.
+        """
+        self.generator = IncrementalGenerator(config_file, output_file, **generator_options)
+        self.snapshot: Dict[str, FileStat] = {}
+
+    def watched_files(self) -> List[str]:
+        """Returns the config file followed by every image the current config references."""
+        paths = [self.generator.config_file]
+        for section in self.generator.config.get("sections", []):
+            paths.extend(section_image_paths(section))
+        return list(dict.fromkeys(paths))
+
+    def build(self, changed_files: Optional[List[str]] = None) -> RebuildReport:
+        """
+        Rebuilds the output, reloading the config first when it is among the changed files.
+
+        A config that fails to load is reported and the previous output is left in place.
+
+        Args:
+            changed_files (Optional[List[str]]): The files whose change triggered the rebuild.
+
+        Returns:
+            RebuildReport: The rebuild latency and how many sections had to be re-rendered.
+        """
+        changed_files = changed_files or []
+        report = RebuildReport(changed_files=changed_files)
+        start = time.perf_counter()
+        try:
+            if self.generator.config_file in changed_files:
+                self.generator.config = self.generator.load_config()
+            self.generator.generate_html()
+            if self.generator.asset_store is not None:
+                self.generator.asset_store.write_manifest()
+        except Exception as e:
+            report.error = str(e)
+        report.duration = time.perf_counter() - start
+        report.sections = len(self.generator.config.get("sections", []))
+        report.rendered_sections = self.generator.rendered_sections
+        return report
+
+    def poll(self) -> Optional[RebuildReport]:
+        """
+        Checks the watched files once and rebuilds if any of them changed.
+
+        Returns:
+            Optional[RebuildReport]: The rebuild report, or None when nothing changed.
+        """
+        current = {path: file_stat(path) for path in self.snapshot}
+        changed = [path for path, stat in current.items() if stat != self.snapshot[path]]
+        if not changed:
+            return None
+        report = self.build(changed)
+        # The config may now reference different images; start watching those as they are now
+        self.snapshot = {path: current[path] if path in current else file_stat(path) for path in self.watched_files()}
+        return report
+
+    def start(self) -> RebuildReport:
+        """
+        Records the current state of the watched files and builds the output from scratch.
+
+        Returns:
+            RebuildReport: The report of the initial build.
+        """
+        self.snapshot = {path: file_stat(path) for path in self.watched_files()}
+        return self.build()
+
+    def run(self, interval: float = 0.5) -> None:
+        """
+        Builds the output, then keeps rebuilding it on every change until interrupted.
+
+        Args:
+            interval (float): Seconds between checks for changes.
+        """
+        print(self.start().summary(), flush=True)
+        print(f"Watching {len(self.snapshot)} files for changes (Ctrl+C to stop)", flush=True)
+        try:
+            while True:
+                time.sleep(interval)
+                report = self.poll()
+                if report is not None:
+                    print(report.summary(), flush=True)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,117 @@
+import pytest
+import os
+import stat
+import json
+import yaml
+from unittest import mock
+from emailer.assets import AssetStore
+from emailer.batch import render_batch
+from emailer.generator import EmailHTMLGenerator
+
+# Fixtures
+@pytest.fixture
+def images(tmp_path):
+    """Fixture for two copies of the same image under different names."""
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    paths = []
+    for name in ("logo.png", "logo-copy.png"):
+        path = source_dir / name
+        path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x01" * 100)
+        paths.append(str(path))
+    return paths
+
+def test_store_deduplicates_by_content(images, tmp_path):
+    """Test that identical images are stored once under their content hash."""
+    store = AssetStore(str(tmp_path / "assets"), base_url="https://cdn.example.com/mail/")
+    urls = {store.url_for(path) for path in images}
+    assert len(urls) == 1
+    url = urls.pop()
+    assert url.startswith("https://cdn.example.com/mail/") and url.endswith(".png")
+    assert sorted(p.name for p in (tmp_path / "assets").iterdir()) == [url.rsplit("/", 1)[1]]
+
+def test_store_skips_known_sources_without_reading(images, tmp_path):
+    """Test that an unchanged source recorded in the manifest is not hashed again."""
+    assets_dir = str(tmp_path / "assets")
+    first = AssetStore(assets_dir)
+    file_name = first.store(images[0])
+    first.write_manifest()
+
+    second = AssetStore(assets_dir)
+    with mock.patch.object(AssetStore, "hash_file") as hash_file:
+        assert second.store(images[0]) == file_name
+    hash_file.assert_not_called()
+
+    manifest = json.loads((tmp_path / "assets" / "manifest.json").read_text(encoding='utf-8'))
+    assert manifest["files"][file_name]["content_type"] == "image/png"
+
+def test_link_mode_in_batch(images, tmp_path):
+    """Test that a batch links images from one shared store and writes a single manifest."""
+    config_dir = tmp_path / "configs"
+    config_dir.mkdir()
+    for index, image in enumerate(images):
+        with open(config_dir / f"email_{index}.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump({"title": "Linked", "sections": [{"type": "image", "src": image, "alt": "logo"}]}, f)
+    assets_dir = tmp_path / "out" / "assets"
+    result = render_batch([str(p) for p in sorted(config_dir.iterdir())], str(tmp_path / "out"), workers=2,
+                          assets_dir=str(assets_dir), asset_base_url="assets")
+    assert not result.failed
+    manifest = json.loads((assets_dir / "manifest.json").read_text(encoding='utf-8'))
+    assert len(manifest["files"]) == 1
+    assert len(manifest["sources"]) == 2
+    file_name = next(iter(manifest["files"]))
+    assert f'src="assets/{file_name}"' in (tmp_path / "out" / "email_0.html").read_text(encoding='utf-8')
+
+def test_link_mode_requires_store(tmp_path):
+    """Test that link mode without an asset store is rejected."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("title: x\n", encoding='utf-8')
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator(str(config_file), image_mode="link")
+
+def test_stored_files_follow_umask(images, tmp_path):
+    """Test that copied images and the manifest get the permissions of a plain open() rather than mkstemp's 0600."""
+    old_umask = os.umask(0o022)
+    try:
+        store = AssetStore(str(tmp_path / "assets"))
+        file_name = store.store(images[0])
+        store.write_manifest()
+    finally:
+        os.umask(old_umask)
+    for name in (file_name, "manifest.json"):
+        assert stat.S_IMODE(os.stat(tmp_path / "assets" / name).st_mode) == 0o644
+
+@pytest.mark.parametrize("image_mode", ["inline", "link"])
+def test_block_image_columns_follow_image_mode(images, tmp_path, image_mode):
+    """Test that image columns in blocks are embedded or linked like image sections instead of always using cid:."""
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Columns", "sections": [
+            {"type": "block", "rows": [{"columns": [{"type": "image", "src": images[0], "alt": "logo"}]}]},
+        ]}, f)
+    store = AssetStore(str(tmp_path / "assets"), base_url="https://cdn.example.com/") if image_mode == "link" else None
+    generator = EmailHTMLGenerator(str(config_file), image_mode=image_mode, asset_store=store)
+    html = generator.render()
+    assert 'src="cid:' not in html
+    assert not generator.inline_images
+    assert ('src="https://cdn.example.com/' if store else 'src="data:image/png;base64,') in html
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_nested_batch_links_relative_to_each_output(images, tmp_path, workers):
+    """Test that outputs in mirrored subdirectories link the shared assets directory through their own relative path."""
+    for name in ("a", "b/c"):
+        config_dir = tmp_path / "configs" / name
+        config_dir.mkdir(parents=True)
+        with open(config_dir / "email.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump({"title": "Nested", "sections": [{"type": "image", "src": images[0], "alt": "logo"}]}, f)
+    (tmp_path / "configs" / "top.yaml").write_text((tmp_path / "configs" / "a" / "email.yaml").read_text(encoding='utf-8'),
+                                                    encoding='utf-8')
+    out = tmp_path / "out"
+    result = render_batch(sorted(str(p) for p in (tmp_path / "configs").rglob("*.yaml")), str(out), workers=workers,
+                          assets_dir=str(out / "assets"))
+    assert not result.failed
+    file_name = next(iter(json.loads((out / "assets" / "manifest.json").read_text(encoding='utf-8'))["files"]))
+    for page, prefix in (("top.html", "assets"), ("a/email.html", "../assets"), ("b/c/email.html", "../../assets")):
+        html = (out / page).read_text(encoding='utf-8')
+        assert f'src="{prefix}/{file_name}"' in html
+        assert (out / page).parent.joinpath(prefix, file_name).exists()
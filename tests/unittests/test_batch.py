@@ -0,0 +1,71 @@
+import pytest
+import os
+import logging
+import yaml
+from emailer.batch import discover_configs, plan_outputs, render_batch
+from emailer.cache import default_image_cache
+from emailer.cli import main
+from emailer.generator import EmailHTMLGenerator
+
+# Fixtures
+@pytest.fixture
+def config_dir(tmp_path):
+    """Fixture for a directory with two valid configs and one broken config."""
+    for name in ("first", "second"):
+        with open(tmp_path / f"{name}.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump({"title": name, "sections": [{"type": "paragraph", "content": f"Hello from {name}"}]}, f)
+    with open(tmp_path / "broken.yaml", 'w', encoding='utf-8') as f:
+        f.write("title: [unterminated\n")
+    return tmp_path
+
+def test_discover_configs_directory_and_manifest(config_dir):
+    """Test that a directory and a manifest resolve to the same config files."""
+    from_dir = discover_configs(str(config_dir))
+    assert [os.path.basename(path) for path in from_dir] == ["broken.yaml", "first.yaml", "second.yaml"]
+
+    manifest = config_dir / "manifest.txt"
+    manifest.write_text("# nightly run\nfirst.yaml\n\nsecond.yaml\n", encoding='utf-8')
+    from_manifest = discover_configs(str(manifest))
+    assert from_manifest == [str(config_dir / "first.yaml"), str(config_dir / "second.yaml")]
+
+def test_plan_outputs_mirrors_directories(tmp_path):
+    """Test that configs with the same name in different directories get distinct outputs."""
+    tasks = plan_outputs([str(tmp_path / "a" / "email.yaml"), str(tmp_path / "b" / "email.yaml")], "out")
+    assert [output for _, output in tasks] == [os.path.join("out", "a", "email.html"), os.path.join("out", "b", "email.html")]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_batch_isolates_failures(config_dir, tmp_path, workers):
+    """Test that a broken config is reported without aborting the rest of the batch."""
+    output_dir = tmp_path / "out"
+    result = render_batch(discover_configs(str(config_dir)), str(output_dir), workers=workers)
+    assert len(result.items) == 3
+    assert [os.path.basename(item.config_file) for item in result.failed] == ["broken.yaml"]
+    assert "Hello from first" in (output_dir / "first.html").read_text(encoding='utf-8')
+    assert "Hello from second" in (output_dir / "second.html").read_text(encoding='utf-8')
+    assert "Rendered 2/3 configs" in result.summary()
+
+def test_plan_outputs_rejects_colliding_outputs(tmp_path):
+    """Test that configs differing only in their extension are rejected instead of overwriting each other."""
+    with pytest.raises(ValueError, match="email.html"):
+        plan_outputs([str(tmp_path / "email.yaml"), str(tmp_path / "email.json")], "out")
+
+def test_serial_batch_leaves_process_state_alone(config_dir, tmp_path):
+    """Test that rendering in the calling process uses its own cache and leaves the shared cache and logger as they were."""
+    logger = logging.getLogger(EmailHTMLGenerator.__name__)
+    level, handlers = logger.level, list(logger.handlers)
+    result = render_batch(discover_configs(str(config_dir)), str(tmp_path / "out"), workers=1,
+                          log_level=logging.DEBUG, image_cache_dir=str(tmp_path / "cache"))
+    assert len(result.succeeded) == 2
+    assert default_image_cache.cache_dir is None
+    assert (logger.level, logger.handlers) == (level, handlers)
+
+@pytest.mark.parametrize("extra", [["--profile", "report.json"], ["--watch"]])
+def test_cli_rejects_single_config_options_in_batch_mode(config_dir, tmp_path, capsys, extra):
+    """Test that options only meaningful for a single config fail in batch mode instead of being ignored."""
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-b", str(config_dir), "-o", str(tmp_path / "out")] + extra)
+    assert exit_info.value.code == 1
+    assert "--batch" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["-b", str(config_dir), "-o", str(tmp_path / "out.eml")])
+    assert not (tmp_path / "out").exists()
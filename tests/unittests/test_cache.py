@@ -0,0 +1,84 @@
+import pytest
+import os
+import base64
+from emailer.cache import ImageCache
+from emailer.generator import EmailHTMLGenerator
+
+# Fixtures
+@pytest.fixture
+def image_file(tmp_path):
+    """Fixture for a small image file on disk."""
+    path = tmp_path / "logo.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+    return str(path)
+
+def counting_encoder():
+    """Returns an encoder that records how often it is called."""
+    calls = []
+    def encode(image_path):
+        calls.append(image_path)
+        return EmailHTMLGenerator.encode_image_base64(image_path)
+    return encode, calls
+
+def test_cache_encodes_unchanged_image_once(image_file):
+    """Test that repeated lookups of the same image only encode it once."""
+    cache = ImageCache()
+    encode, calls = counting_encoder()
+    for _ in range(5):
+        encoded = cache.get(image_file, encode)
+    assert base64.b64decode(encoded).startswith(b"\x89PNG")
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (4, 1)
+
+def test_cache_reencodes_modified_image(image_file):
+    """Test that a change to the file's size or mtime invalidates the entry."""
+    cache = ImageCache()
+    encode, calls = counting_encoder()
+    cache.get(image_file, encode)
+    with open(image_file, 'ab') as f:
+        f.write(b"\x01")
+    os.utime(image_file, ns=(0, 10**9))
+    cache.get(image_file, encode)
+    assert len(calls) == 2
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that the in-memory tier stays within its byte budget."""
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"image_{index}.png"
+        path.write_bytes(bytes([index]) * 30)
+        paths.append(str(path))
+    cache = ImageCache(max_bytes=90)
+    encode, _ = counting_encoder()
+    for path in paths:
+        cache.get(path, encode)
+    assert cache.stats.evictions == 1
+    assert cache.size <= 90
+    cache.get(paths[0], encode)
+    assert cache.stats.misses == 4
+
+def test_cache_disk_tier_is_shared(image_file, tmp_path):
+    """Test that a second cache instance reads the encoding from the on-disk tier."""
+    cache_dir = str(tmp_path / "cache")
+    encode, calls = counting_encoder()
+    first = ImageCache(cache_dir=cache_dir).get(image_file, encode)
+    second_cache = ImageCache(cache_dir=cache_dir)
+    assert second_cache.get(image_file, encode) == first
+    assert len(calls) == 1
+    assert second_cache.stats.disk_hits == 1
+
+def test_cache_reencodes_unreadable_disk_entry(image_file, tmp_path):
+    """Test that an undecodable on-disk entry is logged, re-encoded and replaced rather than raised."""
+    cache_dir = str(tmp_path / "cache")
+    cache = ImageCache(cache_dir=cache_dir)
+    encode, calls = counting_encoder()
+    expected = cache.get(image_file, encode)
+    path = cache._disk_path(cache.key(image_file))
+    with open(path, 'wb') as f:
+        f.write(b"\xff\xfe")
+    fresh = ImageCache(cache_dir=cache_dir)
+    assert fresh.get(image_file, encode) == expected
+    assert len(calls) == 2
+    assert fresh.stats.misses == 1
+    with open(path, 'r', encoding='ascii') as f:
+        assert f.read() == expected
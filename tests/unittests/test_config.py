@@ -0,0 +1,87 @@
+import pytest
+import os
+import json
+import yaml
+from emailer.batch import discover_configs
+from emailer.config import ConfigCache, validate_config, yaml_loader
+from emailer.generator import EmailHTMLGenerator
+
+# Fixtures
+@pytest.fixture
+def config():
+    """Fixture for a small email config."""
+    return {"title": "Config", "sections": [
+        {"type": "header", "content": "Welcome", "styles": {"color": "#333333"}},
+        {"type": "list", "items": ["One", "Two"]},
+    ]}
+
+@pytest.fixture
+def yaml_file(tmp_path, config):
+    """Fixture for the config written as YAML."""
+    path = tmp_path / "config.yaml"
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f)
+    return str(path)
+
+def load_events(generator):
+    """Loads the generator's config and returns the load_config events it emitted."""
+    events = []
+    generator.hooks = [events.append]
+    generator.load_config()
+    return [event for event in events if event.name == "load_config"]
+
+def test_json_config_renders_like_yaml(tmp_path, config, yaml_file):
+    """Test that a .json config is loaded natively and renders the same email as the YAML one."""
+    json_file = tmp_path / "config.json"
+    json_file.write_text(json.dumps(config), encoding='utf-8')
+    assert EmailHTMLGenerator(str(json_file)).render() == EmailHTMLGenerator(yaml_file).render()
+    assert discover_configs(str(tmp_path)) == [str(json_file), yaml_file]
+
+def test_yaml_loader_prefers_libyaml():
+    """Test that the C loader is used whenever PyYAML was built with libyaml."""
+    assert yaml_loader() is (yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader)
+
+def test_config_cache_skips_parsing_unchanged_config(yaml_file, config):
+    """Test that an unchanged config is parsed once, an edited one again, and callers get independent copies."""
+    cache = ConfigCache()
+    generator = EmailHTMLGenerator(yaml_file, config_cache=cache)
+    assert generator.config == config
+    assert [event.cache_hit for event in load_events(generator)] == [True]
+    generator.config["sections"].clear()
+    assert EmailHTMLGenerator(yaml_file, config_cache=cache).config == config
+
+    with open(yaml_file, 'a', encoding='utf-8') as f:
+        f.write("preheader: Edited\n")
+    os.utime(yaml_file, ns=(0, 10**9))
+    assert [event.cache_hit for event in load_events(generator)] == [False]
+    assert generator.config_cache.stats.misses == 2
+
+def test_config_cache_disk_tier_is_shared(tmp_path, yaml_file, config):
+    """Test that a new cache with the same directory reads the parsed config instead of the YAML."""
+    ConfigCache(cache_dir=str(tmp_path / "configs")).get(yaml_file, EmailHTMLGenerator.read_config)
+    cache = ConfigCache(cache_dir=str(tmp_path / "configs"))
+    assert cache.get(yaml_file, lambda path: pytest.fail("config parsed again")) == config
+    assert cache.stats.disk_hits == 1
+
+def test_config_cache_reparses_corrupt_disk_entry(tmp_path, yaml_file, config):
+    """Test that a truncated on-disk entry is treated as a miss and the YAML is parsed again."""
+    ConfigCache(cache_dir=str(tmp_path / "configs")).get(yaml_file, EmailHTMLGenerator.read_config)
+    cache = ConfigCache(cache_dir=str(tmp_path / "configs"))
+    path = cache._disk_path(cache.key(yaml_file))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"sections": [')
+    assert cache.get(yaml_file, EmailHTMLGenerator.read_config) == config
+    assert (cache.stats.disk_hits, cache.stats.misses) == (0, 1)
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == config
+
+def test_invalid_config_is_rejected(tmp_path):
+    """Test that configs without the expected shape fail to load and are never cached."""
+    path = tmp_path / "config.yaml"
+    path.write_text("sections: not a list\n", encoding='utf-8')
+    cache = ConfigCache()
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator(str(path), config_cache=cache)
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        validate_config({"sections": ["header"]})
@@ -1,7 +1,11 @@
 import pytest
+import io
 import os
+import logging
+import threading
 import yaml
 from unittest import mock
+from emailer.cache import ImageCache
 from emailer.generator import EmailHTMLGenerator
 
 # Fixtures
@@ -91,6 +95,151 @@ def test_invalid_image_path(mock_open, mock_exists, mock_yaml_file, mock_config,
         handle = mock_open()
         handle.write.assert_called_once()
 
+def test_iter_html_streams_sections(mock_yaml_file, tmp_path):
+    """Test that the streamed chunks form the same document that generate_html writes."""
+    output_file = tmp_path / "output.html"
+    email_generator = EmailHTMLGenerator(mock_yaml_file, str(output_file))
+    chunks = list(email_generator.iter_html())
+    assert len(chunks) == 4
+    assert "Welcome to the Test Email" in chunks[1]
+    email_generator.generate_html()
+    assert output_file.read_text(encoding='utf-8') == "".join(chunks)
+
+def test_render_to_writes_to_file_object(mock_yaml_file):
+    """Test rendering into a caller supplied file object."""
+    buffer = io.StringIO()
+    EmailHTMLGenerator(mock_yaml_file).render_to(buffer)
+    html = buffer.getvalue()
+    assert html.startswith("<!DOCTYPE html>")
+    assert "This is a test email generated for unit testing." in html
+    assert html.rstrip().endswith("</html>")
+
+@pytest.mark.parametrize("chunk_size", [3, 4, 1024])
+def test_iter_image_base64_matches_whole_file_encoding(tmp_path, chunk_size):
+    """Test that chunked encoding concatenates to the same Base64 text as whole-file encoding."""
+    image_file = tmp_path / "hero.jpg"
+    image_file.write_bytes(os.urandom(4099))
+    chunks = list(EmailHTMLGenerator.iter_image_base64(str(image_file), chunk_size=chunk_size))
+    assert "".join(chunks) == EmailHTMLGenerator.encode_image_base64(str(image_file))
+    assert all("=" not in chunk for chunk in chunks[:-1])
+
+def test_streamed_images_render_identically(tmp_path):
+    """Test that streaming large images does not change the rendered HTML."""
+    image_file = tmp_path / "hero.jpg"
+    image_file.write_bytes(os.urandom(10000))
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Hero", "sections": [{"type": "image", "src": str(image_file), "alt": "hero"}]}, f)
+    whole = "".join(EmailHTMLGenerator(str(config_file)).iter_html())
+    image_cache = mock.Mock()
+    streamed = "".join(EmailHTMLGenerator(str(config_file), stream_images_over=1, image_cache=image_cache).iter_html())
+    assert streamed == whole
+    image_cache.get.assert_not_called()
+
+def test_prefetch_encodes_images_concurrently(tmp_path):
+    """Test that distinct images are encoded in parallel before assembly and render as before."""
+    icons = []
+    for index in range(2):
+        icon = tmp_path / f"icon_{index}.png"
+        icon.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes([index]) * 32)
+        icons.append({"type": "icon", "src": str(icon), "alt": f"icon {index}"})
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Icons", "sections": [
+            {"type": "block", "rows": [{"columns": icons}]},
+            {"type": "image", "src": str(tmp_path / "missing.png"), "alt": "gone"},
+        ]}, f)
+    expected = "".join(EmailHTMLGenerator(str(config_file), prefetch_workers=0, image_cache=ImageCache()).iter_html())
+
+    # Each encoding waits for the other one, so this only completes when both run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    encode = EmailHTMLGenerator.encode_image_base64
+
+    def encode_together(image_path):
+        barrier.wait()
+        return encode(image_path)
+
+    with mock.patch.object(EmailHTMLGenerator, "encode_image_base64", side_effect=encode_together):
+        html = "".join(EmailHTMLGenerator(str(config_file), prefetch_workers=2, image_cache=ImageCache()).iter_html())
+    assert html == expected
+    assert "Image not found: gone" in html
+
+def test_constructor_has_no_side_effects(mock_yaml_file, tmp_path, monkeypatch):
+    """Test that constructing generators creates no files and attaches the log handler only once."""
+    monkeypatch.chdir(tmp_path)
+    before = sorted(os.listdir(tmp_path))
+    handlers = list(logging.getLogger("EmailHTMLGenerator").handlers)
+    for _ in range(3):
+        EmailHTMLGenerator(mock_yaml_file, str(tmp_path / "out" / "email.html"))
+    assert sorted(os.listdir(tmp_path)) == before
+    assert len(logging.getLogger("EmailHTMLGenerator").handlers) == max(len(handlers), 1)
+
+def test_in_memory_config_and_assets(tmp_path):
+    """Test rendering a dict config with images from a resolver, matching a render from files."""
+    logo = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+    (tmp_path / "logo.png").write_bytes(logo)
+    config = {"title": "In memory", "sections": [
+        {"type": "image", "src": "logo.png", "alt": "logo"},
+        {"type": "block", "rows": [{"columns": [{"type": "icon", "src": "logo.png", "alt": "icon"}]}]},
+        {"type": "image", "src": "missing.png", "alt": "gone"},
+    ]}
+    calls = []
+
+    streams = []
+
+    def resolver(path):
+        calls.append(path)
+        if path != "logo.png":
+            return None
+        streams.append(io.BytesIO(logo))
+        return streams[-1]
+
+    generator = EmailHTMLGenerator(config=config, asset_resolver=resolver, stream_images_over=1000)
+    html = generator.render()
+    assert sorted(calls) == ["logo.png", "missing.png"]
+    assert all(stream.closed for stream in streams)
+    assert html.count("data:image/png;base64,") == 2
+    assert "Image not found: gone" in html
+
+    on_disk = {**config, "sections": [
+        {**section, "src": str(tmp_path / section["src"])} if section["type"] == "image" else
+        {"type": "block", "rows": [{"columns": [{"type": "icon", "src": str(tmp_path / "logo.png"), "alt": "icon"}]}]}
+        for section in config["sections"]]}
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump(on_disk, f)
+    assert html == EmailHTMLGenerator(str(config_file)).render()
+
+    buffer = io.BytesIO()
+    generator.render_bytes_to(buffer)
+    assert buffer.getvalue() == generator.render_bytes() == html.encode("utf-8")
+
+def test_generator_requires_one_config_source(mock_yaml_file, mock_config):
+    """Test that exactly one of a config file and a config mapping is accepted."""
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator()
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator(mock_yaml_file, config=mock_config)
+
+def test_failed_render_keeps_previous_output(tmp_path):
+    """Test that a render that raises partway leaves the previous output file intact and no temporary file behind."""
+    output_file = tmp_path / "email.html"
+    EmailHTMLGenerator(config={"sections": [{"type": "paragraph", "content": "Good"}]}, output_file=str(output_file)).generate_html()
+    before = output_file.read_text(encoding='utf-8')
+    broken = EmailHTMLGenerator(config={"sections": [{"type": "paragraph", "content": "Partial"},
+                                                     {"type": "paragraph", "content": 42}]}, output_file=str(output_file))
+    with pytest.raises(AttributeError):
+        broken.generate_html()
+    assert output_file.read_text(encoding='utf-8') == before
+    assert os.listdir(tmp_path) == ["email.html"]
+
+def test_in_memory_config_is_validated():
+    """Test that a config passed in memory is checked like a loaded one."""
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator(config={"sections": "not a list"})
+    with pytest.raises(ValueError):
+        EmailHTMLGenerator(config=["header"])
+
 
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pytest
+import os
+from emailer.files import atomic_open, atomic_write
+
+def test_atomic_write_replaces_destination(tmp_path):
+    """Test that atomic_write replaces the whole file and leaves no temporary file behind."""
+    path = tmp_path / "out.html"
+    path.write_text("old")
+    atomic_write(str(path), "new")
+    atomic_write(str(tmp_path / "out.bin"), b"\x00\x01", 'wb')
+    assert path.read_text() == "new"
+    assert (tmp_path / "out.bin").read_bytes() == b"\x00\x01"
+    assert sorted(os.listdir(tmp_path)) == ["out.bin", "out.html"]
+
+def test_atomic_open_keeps_destination_on_error(tmp_path):
+    """Test that a block which raises leaves the previous file intact and removes the temporary file."""
+    path = tmp_path / "out.html"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_open(str(path)) as f:
+            f.write("partial")
+            raise RuntimeError("render failed")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["out.html"]
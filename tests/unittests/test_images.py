@@ -0,0 +1,99 @@
+import pytest
+import io
+import os
+import pickle
+import yaml
+from emailer.generator import EmailHTMLGenerator
+from emailer.images import ImageOptimizer, detect_mime_type, parse_pixels
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+def test_detect_mime_type():
+    """Test identifying image formats from their leading bytes."""
+    assert detect_mime_type(PNG_HEADER + b"\x00" * 4) == "image/png"
+    assert detect_mime_type(b"\xff\xd8\xff\xe0" + b"\x00" * 8) == "image/jpeg"
+    assert detect_mime_type(b"GIF89a" + b"\x00" * 6) == "image/gif"
+    assert detect_mime_type(b"RIFF\x00\x00\x00\x00WEBP") == "image/webp"
+    assert detect_mime_type(b"not an image") is None
+
+def test_parse_pixels():
+    """Test converting declared widths to pixels."""
+    assert parse_pixels("80px") == 80
+    assert parse_pixels(120) == 120
+    assert parse_pixels("25%", 600) == 150
+    assert parse_pixels("25%") is None
+    assert parse_pixels("auto") is None
+
+def test_data_uri_uses_sniffed_mime_type(tmp_path):
+    """Test that a PNG is embedded as image/png whatever its file extension."""
+    image = tmp_path / "icon.jpg"
+    image.write_bytes(PNG_HEADER + b"\x01" * 64)
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Sniffed", "sections": [{"type": "image", "src": str(image), "alt": "icon"}]}, f)
+    assert 'src="data:image/png;base64,' in "".join(EmailHTMLGenerator(str(config_file)).iter_html())
+
+def test_optimizer_downscales_to_retina_width_and_reuses_cache(tmp_path):
+    """Test that a large image is resized to twice its rendered width and cached for later runs."""
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "hero.png"
+    Image.effect_noise((1600, 800), 64).convert("RGB").save(source)
+    cache_dir = str(tmp_path / "optimized")
+
+    optimizer = ImageOptimizer(cache_dir=cache_dir)
+    optimized = optimizer.optimize(str(source), display_width=300)
+    assert optimized != str(source)
+    assert os.path.getsize(optimized) < os.path.getsize(source)
+    with Image.open(optimized) as result:
+        assert result.size == (600, 300)
+
+    # A fresh optimizer in another process finds the result without re-encoding
+    restored = pickle.loads(pickle.dumps(optimizer))
+    restored._optimize = None
+    assert restored.optimize(str(source), display_width=300) == optimized
+
+def test_optimizer_keeps_small_images(tmp_path):
+    """Test that an image that does not get smaller is embedded unchanged."""
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "dot.png"
+    buffer = io.BytesIO()
+    Image.new("RGBA", (4, 4), (255, 0, 0, 128)).save(buffer, "PNG", optimize=True)
+    source.write_bytes(buffer.getvalue())
+    assert ImageOptimizer(cache_dir=str(tmp_path / "optimized")).optimize(str(source), display_width=100) == str(source)
+
+def test_optimizer_applies_exif_orientation(tmp_path):
+    """Test that a photo taken with the camera rotated is turned upright before it is resized and re-encoded."""
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "photo.jpg"
+    # Stored landscape with orientation 6, so viewers show it rotated 90 degrees clockwise as portrait
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.effect_noise((800, 400), 64).convert("RGB").save(source, "JPEG", exif=exif)
+
+    optimized = ImageOptimizer(cache_dir=str(tmp_path / "optimized")).optimize(str(source), display_width=100)
+    with Image.open(optimized) as result:
+        assert result.size == (200, 400)
+        assert result.getexif().get(0x0112, 1) == 1
+
+def test_optimizer_ignores_references_outside_its_cache(tmp_path):
+    """Test that a planted reference to a file outside the cache is not embedded in place of the image."""
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "hero.png"
+    Image.effect_noise((1600, 800), 64).convert("RGB").save(source)
+    secret = tmp_path / "secret.txt"
+    secret.write_text("private", encoding='utf-8')
+    cache_dir = tmp_path / "optimized"
+    optimized = ImageOptimizer(cache_dir=str(cache_dir)).optimize(str(source), display_width=300)
+
+    references = list(cache_dir.glob("*.ref"))
+    assert references
+    for reference in references:
+        reference.write_text(str(secret), encoding='utf-8')
+    assert ImageOptimizer(cache_dir=str(cache_dir)).optimize(str(source), display_width=300) == optimized
+
+def test_optimizer_cache_defaults_to_user_directory(tmp_path, monkeypatch):
+    """Test that the default cache lives in the user's cache directory rather than a shared temp folder."""
+    pytest.importorskip("PIL.Image")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    assert ImageOptimizer().cache_dir == str(tmp_path / "cache" / "emailer" / "images")
+    assert (tmp_path / "cache" / "emailer" / "images").is_dir()
@@ -0,0 +1,132 @@
+import pytest
+import json
+import zipfile
+import yaml
+from emailer.cli import main
+from emailer.generator import EmailHTMLGenerator
+from emailer.merge import MergeWriter, iter_recipients, iter_shard, run_merge, run_merge_parallel, shard_output
+
+# Fixtures
+@pytest.fixture
+def template_file(tmp_path):
+    """Fixture for a mail merge template config."""
+    config_file = tmp_path / "template.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({
+            "title": "Offer",
+            "sections": [
+                {"type": "paragraph", "content": "Hello {{ first_name }}!"},
+                {"type": "block", "rows": [{"columns": [{"type": "link", "content": "Open", "href": "{{link}}"}]}]},
+            ]
+        }, f)
+    return str(config_file)
+
+@pytest.fixture
+def recipients_csv(tmp_path):
+    """Fixture for a CSV recipients file."""
+    recipients_file = tmp_path / "recipients.csv"
+    recipients_file.write_text("id,first_name,link\n1,Ann,https://a.example\n2,<Bo>,https://b.example\n", encoding='utf-8')
+    return str(recipients_file)
+
+def test_compile_with_merge_fields(template_file):
+    """Test that placeholders become merge fields and values are HTML escaped."""
+    plan = EmailHTMLGenerator(template_file).compile(merge_fields=True)
+    assert plan.fields == ("first_name", "link")
+    html = plan.render({"first_name": "<Bo>", "link": "https://b.example"})
+    assert "Hello &lt;Bo&gt;!" in html
+    assert 'href="https://b.example"' in html
+    assert "{{ first_name }}" in plan.render()
+    with pytest.raises(KeyError):
+        plan.render({"first_name": "Ann"})
+
+def test_run_merge_to_directory(template_file, recipients_csv, tmp_path):
+    """Test writing one personalized file per recipient, named by a field."""
+    output_dir = tmp_path / "out"
+    result = run_merge(template_file, recipients_csv, str(output_dir), name_field="id")
+    assert (result.rendered, result.failed) == (2, 0)
+    assert "Hello Ann!" in (output_dir / "1.html").read_text(encoding='utf-8')
+    assert "Hello &lt;Bo&gt;!" in (output_dir / "2.html").read_text(encoding='utf-8')
+
+def test_run_merge_to_jsonl_records_failures(template_file, tmp_path):
+    """Test JSONL input and output, with a failed recipient that does not stop the merge."""
+    recipients_file = tmp_path / "recipients.jsonl"
+    recipients_file.write_text('{"first_name": "Ann", "link": "https://a"}\n{"first_name": "Bo"}\n', encoding='utf-8')
+    output_file = tmp_path / "out.jsonl"
+    result = run_merge(template_file, str(recipients_file), str(output_file))
+    assert (result.rendered, result.failed) == (1, 1)
+    assert "link" in result.errors[0][1]
+    records = [json.loads(line) for line in output_file.read_text(encoding='utf-8').splitlines()]
+    assert len(records) == 1
+    assert records[0]["index"] == 0
+    assert "Hello Ann!" in records[0]["html"]
+
+def test_run_merge_shards_to_zip(template_file, recipients_csv, tmp_path):
+    """Test that shards split the recipients between separate archives."""
+    output = str(tmp_path / "out.zip")
+    names = []
+    for shard_index in range(2):
+        result = run_merge(template_file, recipients_csv, output, shard_index=shard_index, shard_count=2)
+        assert result.rendered == 1
+        with zipfile.ZipFile(shard_output(output, shard_index, 2)) as archive:
+            names.extend(archive.namelist())
+    assert names == ["recipient-0000000.html", "recipient-0000001.html"]
+    assert len(list(iter_recipients(recipients_csv))) == 2
+
+def test_shards_skip_other_records_before_parsing(tmp_path):
+    """Test that a shard never decodes the records of other shards, so a bad line only fails its own shard."""
+    recipients_file = tmp_path / "recipients.jsonl"
+    recipients_file.write_text('{"first_name": "Ann"}\n\nnot json\n{"first_name": "Cy"}\n', encoding='utf-8')
+    assert list(iter_shard(str(recipients_file), 0, 2)) == [(0, {"first_name": "Ann"}), (2, {"first_name": "Cy"})]
+    with pytest.raises(ValueError):
+        list(iter_shard(str(recipients_file), 1, 2))
+
+    csv_file = tmp_path / "recipients.csv"
+    csv_file.write_text('id,first_name\n1,Ann\n\n2\n3,Cy,extra\n', encoding='utf-8')
+    assert list(iter_shard(str(csv_file), 1, 2)) == [(1, {"id": "2", "first_name": None})]
+    assert list(iter_recipients(str(csv_file)))[2] == {"id": "3", "first_name": "Cy", None: ["extra"]}
+
+@pytest.mark.parametrize("output_name", ["out", "out.zip"])
+def test_run_merge_keeps_recipients_with_the_same_name(template_file, tmp_path, output_name):
+    """Test that recipients sharing a name field value get distinct files instead of overwriting each other."""
+    recipients_file = tmp_path / "recipients.csv"
+    recipients_file.write_text("id,first_name,link\nann,Ann,https://a\nann,Annie,https://b\n", encoding='utf-8')
+    output = tmp_path / output_name
+    result = run_merge(template_file, str(recipients_file), str(output), name_field="id")
+    assert (result.rendered, result.failed) == (2, 0)
+    if output_name.endswith(".zip"):
+        with zipfile.ZipFile(output) as archive:
+            files = {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+    else:
+        files = {path.name: path.read_text(encoding='utf-8') for path in output.iterdir()}
+    assert sorted(files) == ["ann-1.html", "ann.html"]
+    assert "Hello Annie!" in files["ann-1.html"]
+
+def test_merge_writer_is_abstract(tmp_path):
+    """Test that a writer must implement write."""
+    with pytest.raises(TypeError):
+        MergeWriter(str(tmp_path))
+
+def test_parallel_merge_keeps_names_repeated_across_shards(template_file, tmp_path):
+    """Test that shards sharing a directory never overwrite each other's files when names repeat between them."""
+    recipients_file = tmp_path / "recipients.csv"
+    recipients_file.write_text("id,first_name,link\nann,Ann,https://a\nann,Annie,https://a\n"
+                               "bob,Bob,https://b\nbob,Bobby,https://b\n", encoding='utf-8')
+    output = tmp_path / "out"
+    result = run_merge_parallel(template_file, str(recipients_file), str(output), workers=2, name_field="id")
+    assert (result.rendered, result.failed) == (4, 0)
+    files = {path.name: path.read_text(encoding='utf-8') for path in output.iterdir()}
+    assert len(files) == 4
+    for first_name in ("Ann", "Annie", "Bob", "Bobby"):
+        assert sum(f"Hello {first_name}!" in html for html in files.values()) == 1
+
+@pytest.mark.parametrize("extra", [["--profile", "report.json"], ["--watch"], ["--assets-dir", "assets"],
+                                   ["--optimize-output"], ["--workers", "2", "--shard-count", "2"]])
+def test_cli_rejects_unsupported_options_in_merge_mode(template_file, recipients_csv, tmp_path, capsys, extra):
+    """Test that options a mail merge cannot honour fail instead of being ignored."""
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-c", template_file, "-r", recipients_csv, "-o", str(tmp_path / "out")] + extra)
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["-c", template_file, "-r", recipients_csv, "-o", str(tmp_path / "out.eml")])
+    assert not (tmp_path / "out").exists() and not (tmp_path / "out.eml").exists()
@@ -0,0 +1,109 @@
+import pytest
+import io
+import re
+import email
+import yaml
+from emailer.generator import EmailHTMLGenerator
+from emailer.mime import Base64LineEncoder, encode_parameter, html_to_text, write_eml
+
+# Fixtures
+@pytest.fixture
+def eml_config(tmp_path):
+    """Fixture for a config that uses the same logo in three places."""
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4)
+    icon = {"type": "icon", "src": str(logo), "alt": "logo"}
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({
+            "title": "Café news",
+            "sections": [
+                {"type": "header", "content": "Line one\nLine <b>two</b>"},
+                {"type": "image", "src": str(logo), "alt": "hero"},
+                {"type": "block", "rows": [{"columns": [
+                    icon,
+                    {"type": "link", "content": "Read more", "href": "https://example.com"},
+                    {"type": "image", "src": str(logo), "alt": "logo"},
+                ]}]},
+            ]
+        }, f)
+    return str(config_file), logo.read_bytes()
+
+def test_write_eml_attaches_each_image_once(eml_config):
+    """Test that every reference to the same image shares one CID attachment."""
+    config_file, logo_bytes = eml_config
+    buffer = io.BytesIO()
+    write_eml(EmailHTMLGenerator(config_file, image_mode="cid"), buffer, headers={"To": "reader@example.com"})
+    message = email.message_from_bytes(buffer.getvalue())
+
+    assert message["To"] == "reader@example.com"
+    assert str(email.header.make_header(email.header.decode_header(message["Subject"]))) == "Café news"
+    parts = {part.get_content_type(): part for part in message.walk()}
+    images = [part for part in message.walk() if part.get_content_maintype() == "image"]
+    assert len(images) == 1
+    assert images[0].get_payload(decode=True) == logo_bytes
+
+    html = parts["text/html"].get_payload(decode=True).decode("utf-8")
+    cid = images[0]["Content-ID"].strip("<>")
+    assert re.fullmatch(r"[0-9a-f]{32}@emailer\.invalid", cid)
+    assert re.findall(r'src="([^"]+)"', html) == [f"cid:{cid}"] * 3
+
+    text = parts["text/plain"].get_payload(decode=True).decode("utf-8").replace("\r\n", "\n")
+    assert "Line one\nLine two" in text
+    assert "Read more: https://example.com" in text
+
+def test_write_eml_requires_cid_mode(eml_config):
+    """Test that inline data URI generators are rejected for MIME output."""
+    with pytest.raises(ValueError):
+        write_eml(EmailHTMLGenerator(eml_config[0]), io.BytesIO())
+
+def test_base64_line_encoder_streams_short_lines():
+    """Test that fed chunks produce RFC 2045 sized lines that decode to the input."""
+    out = io.BytesIO()
+    encoder = Base64LineEncoder(out.write)
+    data = bytes(range(256)) * 10
+    for start in range(0, len(data), 100):
+        encoder.feed(data[start:start + 100])
+    encoder.close()
+    lines = out.getvalue().split(b"\r\n")
+    assert all(len(line) <= 76 for line in lines)
+    assert email.base64mime.decode(b"".join(lines).decode("ascii")) == data
+
+def test_html_to_text():
+    """Test stripping markup from section content."""
+    assert html_to_text("<i>Hello</i> <b>world</b><br>again") == "Hello world\nagain"
+
+def test_write_eml_with_in_memory_assets():
+    """Test that attachments come from the asset resolver when there is one."""
+    logo = b"GIF89a" + bytes(range(64))
+    config = {"title": "Memory", "sections": [{"type": "image", "src": "logo.gif", "alt": "logo"}]}
+    buffer = io.BytesIO()
+    write_eml(EmailHTMLGenerator(config=config, image_mode="cid", asset_resolver={"logo.gif": logo}.get), buffer)
+    images = [part for part in email.message_from_bytes(buffer.getvalue()).walk() if part.get_content_maintype() == "image"]
+    assert [(part.get_content_type(), part.get_payload(decode=True)) for part in images] == [("image/gif", logo)]
+
+def test_write_eml_neutralizes_header_injection(tmp_path):
+    """Test that line breaks in a title or header value cannot add headers of their own."""
+    config = {"title": "Hi\r\nBcc: victim@example.com", "sections": []}
+    buffer = io.BytesIO()
+    write_eml(EmailHTMLGenerator(config=config, image_mode="cid"), buffer, headers={"X-Note": "a\nCc: other@example.com"})
+    message = email.message_from_bytes(buffer.getvalue())
+    assert message["Bcc"] is None and message["Cc"] is None
+    assert message["Subject"] == "Hi Bcc: victim@example.com"
+    with pytest.raises(ValueError):
+        write_eml(EmailHTMLGenerator(config=config, image_mode="cid"), io.BytesIO(), headers={"Bad\nName": "x"})
+
+def test_write_eml_folds_long_headers():
+    """Test that long and non-ASCII titles are folded into lines within the RFC 5322 limits."""
+    for title in ("word " * 250, "x" * 1200, "Grüße " * 100):
+        buffer = io.BytesIO()
+        write_eml(EmailHTMLGenerator(config={"title": title, "sections": []}, image_mode="cid"), buffer)
+        head = buffer.getvalue().split(b"\r\n\r\n", 1)[0]
+        assert max(len(line) for line in head.split(b"\r\n")) <= 78
+        subject = email.message_from_bytes(buffer.getvalue())["Subject"]
+        assert str(email.header.make_header(email.header.decode_header(subject))).split() == title.split()
+
+def test_encode_parameter_uses_rfc2231_for_non_ascii():
+    """Test that non-ASCII file names are RFC 2231 encoded and ASCII ones quoted."""
+    assert encode_parameter("filename", "lögo.png") == "filename*=utf-8''l%C3%B6go.png"
+    assert encode_parameter("filename", 'a"b.png') == 'filename="a\\"b.png"'
@@ -0,0 +1,77 @@
+import pytest
+import yaml
+from emailer.batch import render_batch
+from emailer.generator import EmailHTMLGenerator, StreamedImage
+from emailer.output import OutputOptimizer, compact_style
+
+# Fixtures
+@pytest.fixture
+def block_config(tmp_path):
+    """Fixture for a config with a streamed image and a block whose rows repeat the same styles."""
+    image = tmp_path / "hero.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 16)
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Optimized", "sections": [
+            {"type": "image", "src": str(image), "alt": "hero"},
+            {"type": "block", "rows": [{"columns": [
+                {"type": "text", "content": f"Cell {i}", "styles": {"font-size": "14px", "color": "#333333"}},
+                {"type": "link", "content": "Open", "href": "https://example.com"},
+            ]} for i in range(4)]},
+        ]}, f)
+    return str(config_file)
+
+def test_optimizer_minifies_and_keeps_mso_markup():
+    """Test that whitespace, comments and redundant attributes go while conditional comments stay as written."""
+    mso = '<!--[if mso]>\n  <style type="text/css">\n    img { width: auto; }\n  </style>\n<![endif]-->'
+    html = f"""<html>
+      <head>
+        <!-- template comment -->
+        <style>
+          .a  {{ color : red ; }}
+        </style>
+        {mso}
+      </head>
+      <body>
+        <td style="color: red;  padding: 10px 20px;" class="" width="100" width="200">  Hello
+          <b>world</b>  </td>
+      </body>
+    </html>"""
+    optimizer = OutputOptimizer()
+    optimized = optimizer.optimize_html(html)
+    assert optimized == (f'<html><head><style>.a{{color:red}}</style>{mso}</head><body>'
+                         f'<td style="color:red;padding:10px 20px" width="100">Hello <b>world</b></td></body></html>')
+    assert optimizer.last_stats.input_bytes == len(html)
+    assert optimizer.last_stats.saved_bytes == len(html) - len(optimized)
+    assert compact_style("background: url(data:image/png;base64,AAAA) ;") == "background:url(data:image/png;base64,AAAA)"
+
+def test_optimizer_hoists_repeated_styles(block_config):
+    """Test that styles repeated across block rows become !important classes and single styles stay inline."""
+    optimizer = OutputOptimizer(hoist_styles=True)
+    html = EmailHTMLGenerator(block_config, output_optimizer=optimizer).render()
+    assert ".s0{color:#333333!important;font-size:14px!important}" in html
+    assert html.count('class="s0"') == 4
+    assert "style=\"color:#333333" not in html
+    assert html.count('class="button s1"') == 4
+    assert optimizer.last_stats.hoisted_styles == 3
+    assert html.count('style="width:') == 1
+    assert html.count("<title>") == 1
+
+def test_optimizer_leaves_images_deferred(block_config):
+    """Test that streamed images pass through as deferred fragments and decode to the same data."""
+    plain = EmailHTMLGenerator(block_config, stream_images_over=1).render()
+    generator = EmailHTMLGenerator(block_config, stream_images_over=1, output_optimizer=OutputOptimizer())
+    fragments = list(generator.iter_output_fragments())
+    assert sum(isinstance(fragment, StreamedImage) for fragment in fragments) == 1
+    optimized = generator.render()
+    data_uri = plain.split('src="')[1].split('"')[0]
+    assert data_uri in optimized
+    assert len(optimized) < len(plain)
+
+def test_batch_reports_bytes_saved(block_config, tmp_path):
+    """Test that a batch sums the bytes saved over its configs and prints them in the summary."""
+    result = render_batch([block_config], str(tmp_path / "out"), workers=1,
+                          generator_options={"output_optimizer": OutputOptimizer()})
+    assert result.output_stats.documents == 1
+    assert result.output_stats.saved_bytes > 0
+    assert "Output optimizer:" in result.summary()
@@ -0,0 +1,46 @@
+import pytest
+import io
+import os
+import yaml
+from emailer.generator import EmailHTMLGenerator, StreamedImage
+from emailer.plan import RenderPlan
+
+# Fixtures
+@pytest.fixture
+def image_config(tmp_path):
+    """Fixture for a config with text sections around a large image."""
+    image_file = tmp_path / "hero.jpg"
+    image_file.write_bytes(os.urandom(5000))
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({
+            "title": "Plan",
+            "sections": [
+                {"type": "header", "content": "Header"},
+                {"type": "image", "src": str(image_file), "alt": "hero"},
+                {"type": "list", "items": ["one", "two"]},
+            ]
+        }, f)
+    return str(config_file)
+
+def test_plan_renders_same_html_as_generator(image_config):
+    """Test that a compiled plan renders exactly what the generator renders."""
+    generator = EmailHTMLGenerator(image_config)
+    plan = generator.compile()
+    assert plan.render() == "".join(generator.iter_html())
+    buffer = io.StringIO()
+    plan.render_to(buffer)
+    assert buffer.getvalue() == plan.render()
+
+def test_plan_joins_static_fragments_and_defers_streamed_images(image_config):
+    """Test that static output is pre-joined while streamed images stay deferred."""
+    plan = EmailHTMLGenerator(image_config, stream_images_over=1).compile()
+    assert [type(fragment) for fragment in plan.fragments] == [str, StreamedImage, str]
+    assert plan.render() == "".join(EmailHTMLGenerator(image_config).iter_html())
+
+def test_plan_is_immutable():
+    """Test that a plan cannot be modified after compilation."""
+    plan = RenderPlan.from_fragments(["<p>", "a", "</p>"])
+    assert plan.fragments == ("<p>a</p>",)
+    with pytest.raises(AttributeError):
+        plan.fragments = ()
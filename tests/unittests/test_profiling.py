@@ -0,0 +1,86 @@
+import pytest
+import json
+import yaml
+from emailer.cache import ImageCache
+from emailer.cli import main
+from emailer.generator import EmailHTMLGenerator
+from emailer.hooks import HookEvent
+from emailer.profiling import Profiler
+
+# Fixtures
+@pytest.fixture
+def profiled_config(tmp_path):
+    """Fixture for a config with a text section, an image and a block of columns."""
+    icon = tmp_path / "icon.png"
+    icon.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x01" * 300)
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump({"title": "Profiled", "sections": [
+            {"type": "paragraph", "content": "Hello"},
+            {"type": "image", "src": str(icon), "alt": "hero"},
+            {"type": "block", "rows": [{"columns": [
+                {"type": "icon", "src": str(icon), "alt": "icon"},
+                {"type": "link", "content": "Open", "href": "https://example.com"},
+            ]}]},
+        ]}, f)
+    return str(config_file)
+
+def test_hooks_receive_every_step(profiled_config):
+    """Test that hooks see the config load, each section and column, and each encode with its cache use."""
+    events = []
+    generator = EmailHTMLGenerator(profiled_config, image_cache=ImageCache(), hooks=[events.append])
+    chunks = list(generator.iter_html())
+    html = "".join(chunks)
+    assert html == "".join(EmailHTMLGenerator(profiled_config, image_cache=ImageCache()).iter_html())
+
+    names = [event.name for event in events]
+    assert names[0] == "load_config" and events[0].bytes > 0
+    assert names.count("section") == 3
+    assert {"image_section", "block_section", "icon_column", "link_column"} <= set(names)
+    sections = [event for event in events if event.name == "section"]
+    assert [event.section for event in sections] == [0, 1, 2]
+    assert sum(event.bytes for event in sections) == sum(len(chunk) for chunk in chunks[1:-1])
+
+    encodes = [event for event in events if event.name == "encode_image"]
+    assert [event.cache_hit for event in encodes] == [False]
+    events.clear()
+    "".join(generator.iter_html())
+    assert [event.cache_hit for event in events if event.name == "encode_image"] == [True]
+
+def test_profile_flag_writes_report(profiled_config, tmp_path, capsys):
+    """Test that --profile writes a JSON report and prints the costliest sections."""
+    report_file = tmp_path / "profile.json"
+    main(["-c", profiled_config, "-o", str(tmp_path / "out.html"), "--profile", str(report_file), "--profile-top", "2"])
+    report = json.loads(report_file.read_text(encoding='utf-8'))
+    assert report["total"]["sections"] == 3
+    assert [section["label"] for section in report["sections"]] == ["paragraph", "image: hero", "block"]
+    output = capsys.readouterr().out
+    assert "Top 2 sections by time:" in output
+    assert "Top 2 sections by output bytes:" in output
+
+def test_profiler_table_ranks_by_bytes():
+    """Test that the table lists the largest section first in the bytes ranking."""
+    profiler = Profiler()
+    profiler(HookEvent("section", "paragraph", 0, 0.002, 10))
+    profiler(HookEvent("section", "image: hero", 1, 0.001, 5000))
+    table = profiler.table(top=1)
+    by_time, by_bytes = table.split("by output bytes:")
+    assert "paragraph" in by_time and "image: hero" in by_bytes.splitlines()[2]
+
+def test_failed_steps_emit_events_with_error(tmp_path):
+    """Test that a step that raises still emits its event, marked with the error, and the profile lists it."""
+    events = []
+    with pytest.raises(FileNotFoundError):
+        EmailHTMLGenerator(str(tmp_path / "missing.yaml"), hooks=[events.append])
+    assert [event.name for event in events] == ["load_config"]
+    assert events[0].error.startswith("FileNotFoundError")
+
+    profiler = Profiler()
+    generator = EmailHTMLGenerator(config={"sections": [{"type": "paragraph", "content": "Hello"},
+                                                        {"type": "paragraph", "content": 42}]}, hooks=[profiler])
+    with pytest.raises(AttributeError):
+        generator.render()
+    failed = [event for event in profiler.events if event.error]
+    assert [(event.name, event.section) for event in failed] == [("section", 1)]
+    assert profiler.report()["steps"]["section"]["errors"] == 1
+    assert "1 failed steps:" in profiler.table()
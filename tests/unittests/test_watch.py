@@ -0,0 +1,96 @@
+import pytest
+import os
+import stat
+import yaml
+from emailer.generator import EmailHTMLGenerator
+from emailer.watch import Watcher
+
+# Fixtures
+@pytest.fixture
+def watched(tmp_path):
+    """Fixture for a config with two text sections and an image, and a watcher started on it."""
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x01" * 64)
+    config = {
+        "title": "Watched",
+        "sections": [
+            {"type": "header", "content": "Welcome"},
+            {"type": "paragraph", "content": "First draft"},
+            {"type": "image", "src": str(logo), "alt": "logo"},
+        ]
+    }
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f)
+    watcher = Watcher(str(config_file), str(tmp_path / "out.html"))
+    report = watcher.start()
+    assert report.rendered_sections == 3
+    return watcher, config, config_file, logo
+
+def touch(path, content):
+    """Rewrites a file and moves its modification time forward so the change is always detectable."""
+    st = os.stat(path)
+    path.write_bytes(content)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_poll_without_changes(watched):
+    """Test that nothing is rebuilt while the files are unchanged."""
+    watcher = watched[0]
+    assert watcher.poll() is None
+
+def test_config_edit_rerenders_changed_section_only(watched, tmp_path):
+    """Test that editing one section re-renders only that section and matches a full render."""
+    watcher, config, config_file, _ = watched
+    config["sections"][1]["content"] = "Second draft"
+    touch(config_file, yaml.dump(config).encode("utf-8"))
+
+    report = watcher.poll()
+    assert report.error is None
+    assert report.changed_files == [str(config_file)]
+    assert (report.sections, report.rendered_sections) == (3, 1)
+    expected = "".join(EmailHTMLGenerator(str(config_file)).iter_html())
+    assert (tmp_path / "out.html").read_text(encoding='utf-8') == expected
+
+def test_image_change_rerenders_its_section(watched, tmp_path):
+    """Test that touching a referenced image rebuilds the section that embeds it."""
+    watcher, _, _, logo = watched
+    touch(logo, b"\x89PNG\r\n\x1a\n" + b"\x02" * 64)
+
+    report = watcher.poll()
+    assert report.changed_files == [str(logo)]
+    assert report.rendered_sections == 1
+    assert "".join(EmailHTMLGenerator(watcher.generator.config_file).iter_html()) == \
+        (tmp_path / "out.html").read_text(encoding='utf-8')
+
+def test_invalid_config_keeps_previous_output(watched, tmp_path):
+    """Test that a config that fails to parse is reported and the last good output is kept."""
+    watcher, _, config_file, _ = watched
+    before = (tmp_path / "out.html").read_text(encoding='utf-8')
+    touch(config_file, b"sections: [unclosed\n")
+
+    report = watcher.poll()
+    assert report.error
+    assert (tmp_path / "out.html").read_text(encoding='utf-8') == before
+    assert watcher.poll() is None
+
+def test_rebuild_reports_section_indexes(watched):
+    """Test that hook events from a rebuild carry the index of the section they belong to."""
+    watcher, _, _, logo = watched
+    events = []
+    watcher.generator.hooks = [events.append]
+    touch(logo, b"\x89PNG\r\n\x1a\n" + b"\x03" * 64)
+    watcher.poll()
+    assert {event.section for event in events if event.name == "section"} == {2}
+    assert watcher.generator.current_section is None
+
+def test_output_follows_umask(watched, tmp_path):
+    """Test that the atomically replaced output is readable like a file written with open()."""
+    watcher, config, config_file, _ = watched
+    old_umask = os.umask(0o022)
+    try:
+        config["sections"][0]["content"] = "Hello again"
+        touch(config_file, yaml.dump(config).encode("utf-8"))
+        watcher.poll()
+    finally:
+        os.umask(old_umask)
+    assert stat.S_IMODE(os.stat(tmp_path / "out.html").st_mode) == 0o644